@@ -0,0 +1,116 @@
+"""
+Concurrent read/write throughput of the app's SQLite file, default vs. tuned.
+
+Mimics production: one process plays the scheduler, committing small
+CaseUpdate-sized transactions, while several processes play gunicorn workers
+running the dashboard's "latest 5 updates for a client" read.
+
+    python benchmarks/sqlite_profile_bench.py [--seconds 5] [--readers 4]
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.sqlite_profile import SQLITE_PRAGMAS, apply_sqlite_profile  # noqa: E402
+
+CLIENTS = 500
+
+# What SQLite does out of the box (rollback journal, full fsync, no busy wait)
+DEFAULT_PRAGMAS = {"busy_timeout": 0, "journal_mode": "DELETE", "synchronous": "FULL"}
+
+def connect(path, pragmas):
+    """Worker connection; journal_mode is persistent and was already set by setup()."""
+    conn = sqlite3.connect(path, timeout=0)
+    while True:
+        try:
+            apply_sqlite_profile(conn, {k: v for k, v in pragmas.items() if k != "journal_mode"})
+            return conn
+        except sqlite3.OperationalError:  # even the PRAGMAs can hit "database is locked"
+            time.sleep(0.001)
+
+def setup(path, pragmas):
+    conn = sqlite3.connect(path)
+    apply_sqlite_profile(conn, pragmas)
+    conn.executescript(
+        "CREATE TABLE case_updates (id INTEGER PRIMARY KEY, client_id INTEGER, summary TEXT, created_at REAL);"
+        "CREATE INDEX ix_case_updates_client_id_created_at ON case_updates (client_id, created_at DESC);"
+    )
+    conn.executemany(
+        "INSERT INTO case_updates (client_id, summary, created_at) VALUES (?, ?, ?)",
+        [(i % CLIENTS, "x" * 400, time.time()) for i in range(20000)],
+    )
+    conn.commit()
+    conn.close()
+
+def writer(path, pragmas, seconds, results):
+    conn = connect(path, pragmas)
+    done = errors = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            conn.execute(
+                "INSERT INTO case_updates (client_id, summary, created_at) VALUES (?, ?, ?)",
+                (random.randrange(CLIENTS), "x" * 400, time.time()),
+            )
+            conn.commit()
+            done += 1
+        except sqlite3.OperationalError:  # "database is locked"
+            conn.rollback()
+            errors += 1
+    results.put(("write", done, errors))
+
+def reader(path, pragmas, seconds, results):
+    conn = connect(path, pragmas)
+    done = errors = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            conn.execute(
+                "SELECT id, summary FROM case_updates WHERE client_id = ? ORDER BY created_at DESC LIMIT 5",
+                (random.randrange(CLIENTS),),
+            ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(("read", done, errors))
+
+def run(label, pragmas, seconds, readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path, pragmas)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=writer, args=(path, pragmas, seconds, results))]
+        procs += [multiprocessing.Process(target=reader, args=(path, pragmas, seconds, results)) for _ in range(readers)]
+        for p in procs:
+            p.start()
+        totals = {"write": [0, 0], "read": [0, 0]}
+        for _ in procs:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for p in procs:
+            p.join()
+
+    print(
+        f"{label:<8} writes/s={totals['write'][0] / seconds:>9.0f}  "
+        f"reads/s={totals['read'][0] / seconds:>9.0f}  "
+        f"locked errors: write={totals['write'][1]} read={totals['read'][1]}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    run("default", DEFAULT_PRAGMAS, args.seconds, args.readers)
+    run("tuned", SQLITE_PRAGMAS, args.seconds, args.readers)
+
+if __name__ == "__main__":
+    main()
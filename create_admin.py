@@ -1,23 +1,10 @@
-from start_app import app, db
-from models import User
-from werkzeug.security import generate_password_hash
+# The admin user (ADMIN_EMAIL / ADMIN_PASSWORD) is created by the bootstrap step,
+# along with the tables it needs; equivalent to `flask --app start_app bootstrap`
+import os
 
-with app.app_context():
-    admin_email = "admin@casepulseai.com"
-    admin_password = "admin123"
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ["BOOTSTRAP_ON_IMPORT"] = "false"  # bootstrap() below does it once
 
-    # Hash the password securely
-    hashed_password = generate_password_hash(admin_password)
+from start_app import bootstrap  # noqa: E402
 
-    # Check if admin already exists
-    admin = User.query.filter_by(email=admin_email).first()
-
-    if not admin:
-        new_admin = User(email=admin_email, hashed_password=hashed_password, role="admin")
-        db.session.add(new_admin)
-        db.session.commit()
-        print("✅ Admin user created successfully!")
-        print(f"Email: {admin_email}")
-        print(f"Password: {admin_password}")
-    else:
-        print("ℹ️ Admin user already exists.")
+bootstrap()
@@ -1,10 +1,46 @@
+import os
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_migrate import Migrate
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
+# Initialize Flask-Migrate (schema changes live in migrations/)
+migrate = Migrate()
+
 # Initialize LoginManager
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"  # redirect unauthorized users to /login
 login_manager.login_message_category = "info"
+
+
+# Database engine settings (DATABASE_URL selects the backend)
+def database_uri(default_uri):
+    """DATABASE_URL if set, else `default_uri`; Heroku-style postgres:// URLs are normalized."""
+    uri = os.getenv("DATABASE_URL") or default_uri
+    if uri.startswith("postgres://"):
+        uri = uri.replace("postgres://", "postgresql://", 1)
+    return uri
+
+def engine_options(uri):
+    """
+    SQLAlchemy engine options for the given URI.
+
+    pre-ping and recycle drop connections the server closed behind our back;
+    pool size and overflow cap connections per gunicorn worker, so
+    workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) must fit the server's limit.
+    In-memory SQLite uses a static pool that takes no sizing options.
+    """
+    options = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    if uri.startswith("sqlite") and (":memory:" in uri or uri.rstrip("/") == "sqlite:"):
+        return options
+    options.update({
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    })
+    return options
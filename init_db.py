@@ -1,15 +1,9 @@
-from start_app import app, db
-from models import User
-from werkzeug.security import generate_password_hash
+# Same one-time setup as `flask --app start_app bootstrap`
+import os
 
-with app.app_context():
-    db.create_all()
-    if not User.query.filter_by(email="admin@casepulseai.com").first():
-        admin = User(
-            email="admin@casepulseai.com",
-            password_hash=generate_password_hash("your_admin_password"),
-            role="admin"
-        )
-        db.session.add(admin)
-        db.session.commit()
-        print("✅ Admin user created successfully.")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ["BOOTSTRAP_ON_IMPORT"] = "false"  # bootstrap() below does it once
+
+from start_app import bootstrap  # noqa: E402
+
+bootstrap()
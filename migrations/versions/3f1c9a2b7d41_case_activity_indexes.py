@@ -0,0 +1,42 @@
+"""Index case_updates and messages for time-ordered per-client reads
+
+Revision ID: 3f1c9a2b7d41
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a2b7d41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('case_updates', 'ix_case_updates_client_id_created_at', ['client_id', sa.text('created_at DESC')]),
+    ('case_updates', 'ix_case_updates_created_at', ['created_at']),
+    ('messages', 'ix_messages_client_id_created_at', ['client_id', sa.text('created_at DESC')]),
+    ('messages', 'ix_messages_created_at', ['created_at']),
+]
+
+
+def _existing_indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have these
+    for table, name, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, name, _columns in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,37 @@
+"""Add analysis_watermarks for incremental case analysis
+
+Revision ID: 5b2e8c41d0a7
+Revises: 3f1c9a2b7d41
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8c41d0a7'
+down_revision = '3f1c9a2b7d41'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have it
+    if _has_table('analysis_watermarks'):
+        return
+    op.create_table(
+        'analysis_watermarks',
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id'), primary_key=True),
+        sa.Column('analyzed_at', sa.DateTime(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+    )
+
+
+def downgrade():
+    if _has_table('analysis_watermarks'):
+        op.drop_table('analysis_watermarks')
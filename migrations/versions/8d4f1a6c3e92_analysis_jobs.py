@@ -0,0 +1,44 @@
+"""Add analysis_jobs for background "Analyze all clients" runs
+
+Revision ID: 8d4f1a6c3e92
+Revises: 5b2e8c41d0a7
+Create Date: 2026-10-17 22:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f1a6c3e92'
+down_revision = '5b2e8c41d0a7'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have it
+    if _has_table('analysis_jobs'):
+        return
+    op.create_table(
+        'analysis_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('only_changed', sa.Boolean(), nullable=False),
+        sa.Column('total_clients', sa.Integer(), nullable=False),
+        sa.Column('processed_clients', sa.Integer(), nullable=False),
+        sa.Column('succeeded_clients', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    if _has_table('analysis_jobs'):
+        op.drop_table('analysis_jobs')
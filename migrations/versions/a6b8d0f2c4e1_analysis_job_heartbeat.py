@@ -0,0 +1,38 @@
+"""Track the owning worker and heartbeat of analysis jobs
+
+Revision ID: a6b8d0f2c4e1
+Revises: f4c2a8e6d913
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6b8d0f2c4e1'
+down_revision = 'f4c2a8e6d913'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have them
+    columns = _columns('analysis_jobs')
+    if 'claimed_by' not in columns:
+        op.add_column('analysis_jobs', sa.Column('claimed_by', sa.String(length=64), nullable=True))
+    if 'heartbeat_at' not in columns:
+        op.add_column('analysis_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    columns = _columns('analysis_jobs')
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        if 'heartbeat_at' in columns:
+            batch_op.drop_column('heartbeat_at')
+        if 'claimed_by' in columns:
+            batch_op.drop_column('claimed_by')
@@ -0,0 +1,38 @@
+"""Add scheduler_leases for single-leader scheduling
+
+Revision ID: c7a93e05b1f4
+Revises: 8d4f1a6c3e92
+Create Date: 2026-10-17 22:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a93e05b1f4'
+down_revision = '8d4f1a6c3e92'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have it
+    if _has_table('scheduler_leases'):
+        return
+    op.create_table(
+        'scheduler_leases',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('holder', sa.String(length=120), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('renewed_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    if _has_table('scheduler_leases'):
+        op.drop_table('scheduler_leases')
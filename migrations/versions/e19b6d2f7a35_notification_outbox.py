@@ -0,0 +1,53 @@
+"""Add notification_outbox for queued SMS/email sends
+
+Revision ID: e19b6d2f7a35
+Revises: c7a93e05b1f4
+Create Date: 2026-10-17 22:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e19b6d2f7a35'
+down_revision = 'c7a93e05b1f4'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have it
+    if _has_table('notification_outbox'):
+        return
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('channel', sa.String(length=10), nullable=False),
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('recipient', sa.String(length=120), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=True),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('claimed_by', sa.String(length=64), nullable=True),
+        sa.Column('claimed_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        'ix_notification_outbox_status_next_attempt_at', 'notification_outbox',
+        ['status', 'next_attempt_at'], unique=False,
+    )
+
+
+def downgrade():
+    if _has_table('notification_outbox'):
+        op.drop_index('ix_notification_outbox_status_next_attempt_at', table_name='notification_outbox')
+        op.drop_table('notification_outbox')
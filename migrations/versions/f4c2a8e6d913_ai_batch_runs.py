@@ -0,0 +1,50 @@
+"""Add ai_batch_runs for nightly Batch API analysis
+
+Revision ID: f4c2a8e6d913
+Revises: e19b6d2f7a35
+Create Date: 2026-10-17 22:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c2a8e6d913'
+down_revision = 'e19b6d2f7a35'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() may already have it
+    if _has_table('ai_batch_runs'):
+        return
+    op.create_table(
+        'ai_batch_runs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('batch_id', sa.String(length=100), nullable=True),
+        sa.Column('input_file_id', sa.String(length=100), nullable=True),
+        sa.Column('output_file_id', sa.String(length=100), nullable=True),
+        sa.Column('error_file_id', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('provider_status', sa.String(length=20), nullable=True),
+        sa.Column('manifest', sa.Text(), nullable=False),
+        sa.Column('total_requests', sa.Integer(), nullable=False),
+        sa.Column('succeeded_requests', sa.Integer(), nullable=False),
+        sa.Column('failed_requests', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('checked_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('batch_id'),
+    )
+
+
+def downgrade():
+    if _has_table('ai_batch_runs'):
+        op.drop_table('ai_batch_runs')
@@ -1,8 +1,23 @@
+import os
 from datetime import datetime
+from functools import lru_cache
 from extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Werkzeug method string for new password hashes, e.g. "scrypt:32768:8:1" or
+# "pbkdf2:sha256:600000". Older hashes are upgraded on the next successful login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+@lru_cache(maxsize=None)
+def password_hash_prefix(method):
+    """
+    The method string Werkzeug stores for `method`. Short forms are expanded
+    ("scrypt" -> "scrypt:32768:8:1"), so stored hashes are compared with this
+    rather than with the configured value.
+    """
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
 # ========================
 # USER MODEL
 # ========================
@@ -16,11 +31,14 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def password_needs_rehash(self):
+        return self.password_hash.split("$", 1)[0] != password_hash_prefix(PASSWORD_HASH_METHOD)
+
     def __repr__(self):
         return f"<User {self.email}>"
 
@@ -54,7 +72,12 @@ class CaseUpdate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey("clients.id"))
     summary = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Per-client "latest N" reads walk this index instead of sorting the table
+    __table_args__ = (
+        db.Index("ix_case_updates_client_id_created_at", client_id, created_at.desc()),
+    )
 
     def __repr__(self):
         return f"<CaseUpdate {self.id} - Client {self.client_id}>"
@@ -69,9 +92,160 @@ class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey("clients.id"))
     message = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index("ix_messages_client_id_created_at", client_id, created_at.desc()),
+    )
 
     client = db.relationship("Client", backref=db.backref("messages", cascade="all, delete-orphan"))
 
     def __repr__(self):
         return f"<Message to {self.client_id}>"
+
+
+# ========================
+# ANALYSIS WATERMARK MODEL
+# ========================
+class AnalysisWatermark(db.Model):
+    __tablename__ = "analysis_watermarks"
+
+    # One row per client: when it was last analyzed and a hash of the prompt used
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), primary_key=True)
+    analyzed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64))
+
+    client = db.relationship(
+        "Client",
+        backref=db.backref("analysis_watermark", uselist=False, cascade="all, delete-orphan"),
+    )
+
+    def __repr__(self):
+        return f"<AnalysisWatermark client={self.client_id} at={self.analyzed_at}>"
+
+
+# ========================
+# ANALYSIS JOB MODEL
+# ========================
+class AnalysisJob(db.Model):
+    __tablename__ = "analysis_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, completed, failed
+    only_changed = db.Column(db.Boolean, nullable=False, default=False)
+    total_clients = db.Column(db.Integer, nullable=False, default=0)
+    processed_clients = db.Column(db.Integer, nullable=False, default=0)
+    succeeded_clients = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Run token of the worker thread that owns the job, and its last sign of life
+    claimed_by = db.Column(db.String(64))
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "only_changed": self.only_changed,
+            "total_clients": self.total_clients,
+            "processed_clients": self.processed_clients,
+            "succeeded_clients": self.succeeded_clients,
+            "progress": round(100 * self.processed_clients / self.total_clients) if self.total_clients else (100 if self.status == "completed" else 0),
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<AnalysisJob {self.id} {self.status}>"
+
+
+# ========================
+# SCHEDULER LEASE MODEL
+# ========================
+class SchedulerLease(db.Model):
+    """A named lease; whichever process holds an unexpired lease is the leader."""
+    __tablename__ = "scheduler_leases"
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} held by {self.holder}>"
+
+
+# ========================
+# NOTIFICATION OUTBOX MODEL
+# ========================
+class NotificationOutbox(db.Model):
+    """An SMS or email waiting to be sent (or retried) by the outbox dispatcher."""
+    __tablename__ = "notification_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(10), nullable=False)  # sms, email
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id", ondelete="SET NULL"))
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255))
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(64))
+    claimed_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_notification_outbox_status_next_attempt_at", status, next_attempt_at),
+    )
+
+    def __repr__(self):
+        return f"<NotificationOutbox {self.id} {self.channel} {self.status}>"
+
+
+# ========================
+# AI BATCH RUN MODEL
+# ========================
+class AIBatchRun(db.Model):
+    """One OpenAI Batch API submission of client analysis prompts."""
+    __tablename__ = "ai_batch_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.String(100), unique=True)  # OpenAI batch id
+    input_file_id = db.Column(db.String(100))
+    output_file_id = db.Column(db.String(100))
+    error_file_id = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False, default="submitted")  # submitted, completed, failed
+    provider_status = db.Column(db.String(20))  # validating, in_progress, finalizing, completed, expired, ...
+    manifest = db.Column(db.Text, nullable=False)  # JSON {client_id: prompt fingerprint}
+    total_requests = db.Column(db.Integer, nullable=False, default=0)
+    succeeded_requests = db.Column(db.Integer, nullable=False, default=0)
+    failed_requests = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    checked_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "provider_status": self.provider_status,
+            "total_requests": self.total_requests,
+            "succeeded_requests": self.succeeded_requests,
+            "failed_requests": self.failed_requests,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<AIBatchRun {self.id} {self.batch_id} {self.status}>"
@@ -1,12 +1,19 @@
-from flask import Blueprint, request, jsonify
-from openai import OpenAI
-import os
-from models import db, Client, CaseUpdate
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_login import login_required
+from models import db, CaseUpdate, AnalysisJob, AIBatchRun
+from services.ai_agent import complete_prompt
+from services.jobs import enqueue_analysis_job, fail_interrupted_jobs, job_is_stale
+from services.llm_cache import get_llm_cache
+from services.identity_cache import identity_cache
+from services.rate_limit import get_rate_limiter
+from services.dashboard_queries import paginate_clients
+from services.client_import import import_clients, detect_format
+from services.data_export import EXPORTS, generate_csv, generate_ndjson
+from services.search import search
 
 api_bp = Blueprint("api", __name__)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-client = OpenAI(api_key=OPENAI_API_KEY)
+ANALYZE_SYSTEM_PROMPT = "You are an assistant that analyzes legal case updates for clients."
 
 @api_bp.route("/analyze", methods=["POST"])
 def analyze_update():
@@ -15,29 +22,88 @@ def analyze_update():
     if not data or "text" not in data:
         return jsonify({"error": "Missing 'text' field"}), 400
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an assistant that analyzes legal case updates for clients."},
-                {"role": "user", "content": data["text"]}
-            ],
-            max_tokens=150
+        # temperature=None keeps the API default; repeated texts are served from the cache
+        result = complete_prompt(
+            data["text"],
+            system_prompt=ANALYZE_SYSTEM_PROMPT,
+            temperature=None,
+            max_tokens=150,
         )
-        result = response.choices[0].message.content.strip()
         return jsonify({"analysis": result})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @api_bp.route("/clients", methods=["GET"])
 def list_clients():
-    """List all clients for the admin dashboard."""
-    clients = Client.query.all()
-    return jsonify([{
-        "id": c.id,
-        "name": c.name,
-        "email": c.email,
-        "phone": c.phone_number
-    } for c in clients])
+    """
+    List clients in id order, one page at a time: ?limit=N&cursor=<next_cursor
+    from the previous page>. Returns {"clients": [...], "next_cursor": ...}.
+    """
+    try:
+        clients, next_cursor = paginate_clients(
+            cursor=request.args.get("cursor"),
+            limit=request.args.get("limit", type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "clients": [{
+            "id": c.id,
+            "name": c.name,
+            "email": c.email,
+            "phone": c.phone,
+            "created_at": c.created_at.isoformat() if c.created_at else None,
+        } for c in clients],
+        "next_cursor": next_cursor,
+    })
+
+@api_bp.route("/clients/import", methods=["POST"])
+@login_required
+def import_clients_upload():
+    """
+    Bulk-import clients from CSV, NDJSON or a JSON array.
+
+    Send a multipart "file" field, or the raw file as the request body with a
+    matching Content-Type. ?format=csv|ndjson|json overrides detection.
+    """
+    upload = request.files.get("file")
+    if upload:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, detect_format(content_type=request.content_type)
+    fmt = request.args.get("format") or fmt
+    if fmt not in ("csv", "ndjson", "json"):
+        return jsonify({"error": "Unsupported or missing import format"}), 400
+
+    report = import_clients(stream, fmt)
+    return jsonify(report), (400 if "fatal_error" in report and not report["inserted"] else 200)
+
+@api_bp.route("/search", methods=["GET"])
+@login_required
+def search_activity():
+    """Ranked full-text search over case update summaries and messages: ?q=...&limit=N"""
+    query = request.args.get("q", "")
+    return jsonify({"query": query, "results": search(query, limit=request.args.get("limit", type=int))})
+
+@api_bp.route("/export/<kind>", methods=["GET"])
+@login_required
+def export_table(kind):
+    """Stream clients, case_updates or messages as ?format=csv (default) or ndjson."""
+    if kind not in EXPORTS:
+        return jsonify({"error": f"Unknown export '{kind}'", "available": sorted(EXPORTS)}), 404
+    fmt = request.args.get("format", "csv")
+    if fmt == "csv":
+        generate, mimetype = generate_csv, "text/csv"
+    elif fmt == "ndjson":
+        generate, mimetype = generate_ndjson, "application/x-ndjson"
+    else:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    return Response(
+        stream_with_context(generate(kind)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+    )
 
 @api_bp.route("/case-update", methods=["POST"])
 def create_case_update():
@@ -52,3 +118,45 @@ def create_case_update():
     db.session.add(new_update)
     db.session.commit()
     return jsonify({"message": "Case update added successfully"})
+
+@api_bp.route("/jobs", methods=["POST"])
+@login_required
+def create_analysis_job():
+    """Queue a background AI analysis job and return its id immediately."""
+    data = request.get_json(silent=True) or {}
+    job = enqueue_analysis_job(only_changed=bool(data.get("only_changed", False)))
+    return jsonify(job.to_dict()), 202
+
+@api_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def get_analysis_job(job_id):
+    """Report the progress of a background analysis job."""
+    job = db.session.get(AnalysisJob, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job_is_stale(job):
+        # Its worker died; report that instead of letting the dashboard poll forever
+        fail_interrupted_jobs(job_ids=[job.id])
+        db.session.refresh(job)
+    return jsonify(job.to_dict())
+
+@api_bp.route("/ai-batches", methods=["GET"])
+@login_required
+def list_ai_batches():
+    """Status of the most recent Batch API analysis runs."""
+    runs = AIBatchRun.query.order_by(AIBatchRun.id.desc()).limit(20).all()
+    return jsonify({"runs": [run.to_dict() for run in runs]})
+
+@api_bp.route("/cache/stats", methods=["GET"])
+@login_required
+def cache_stats():
+    """Hit/miss counters for the in-app caches."""
+    cache = get_llm_cache()
+    return jsonify({"llm": cache.stats() if cache else None, "identity": identity_cache.stats()})
+
+@api_bp.route("/rate-limits", methods=["GET"])
+@login_required
+def rate_limit_stats():
+    """Current adaptive send rate and 429 count per notification provider."""
+    limiter = get_rate_limiter()
+    return jsonify({"providers": limiter.stats() if limiter else None})
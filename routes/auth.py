@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required
 from werkzeug.security import check_password_hash
 from models import User
 from extensions import db
+from services.login_throttle import check_login_allowed, verify_password, LoginBusy
 
 
 auth_bp = Blueprint("auth", __name__)
@@ -29,9 +30,22 @@ def login():
         email = request.form.get("email").strip()
         password = request.form.get("password").strip()
 
+        # Throttle before touching the password hash: rejected attempts cost no CPU
+        retry_after = check_login_allowed(request.remote_addr, email)
+        if retry_after:
+            flash(f"⏳ Too many login attempts. Try again in {retry_after} seconds.", "warning")
+            return render_template("login.html"), 429, {"Retry-After": str(retry_after)}
+
         user = User.query.filter_by(email=email).first()
 
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and verify_password(user, password)
+        except LoginBusy:
+            flash("⏳ The server is busy. Please try again in a moment.", "warning")
+            return render_template("login.html"), 503, {"Retry-After": "1"}
+
+        if valid:
+            db.session.commit()  # persists a re-hash under the current PASSWORD_HASH_METHOD
             login_user(user)
             flash("✅ Logged in successfully!", "success")
             return redirect(url_for("dash_bp.dashboard"))
@@ -1,26 +1,30 @@
 from flask_login import login_required
 from extensions import db
-from models import Client, CaseUpdate, Message
-from services.ai_agent import analyze_client_cases
+from models import Client
+from services.jobs import enqueue_analysis_job
+from services.dashboard_queries import load_dashboard, load_client_details
+from services.client_import import import_clients, detect_format
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 
 dash_bp = Blueprint('dash_bp', __name__, url_prefix="/dashboard")
 
 @dash_bp.route('/')
 def dashboard():
-    return render_template("dashboard.html")
+    try:
+        data = load_dashboard(cursor=request.args.get("cursor"))
+    except ValueError:
+        return redirect(url_for("dash_bp.dashboard"))
+    return render_template(
+        "dashboard.html",
+        job_id=request.args.get("job", type=int),
+        **data,
+    )
 
 # optional redirect if other parts call dashboard_home
 @dash_bp.route('/dashboard_home')
 def dashboard_home():
     return redirect(url_for('dash_bp.dashboard'))
 
-
-    clients = Client.query.all()
-    case_updates = CaseUpdate.query.order_by(CaseUpdate.created_at.desc()).limit(5).all()
-    messages = Message.query.order_by(Message.created_at.desc()).limit(5).all()
-    return render_template("dashboard.html", clients=clients, case_updates=case_updates, messages=messages)
-
 # ==========================
 # Add a new client
 # ==========================
@@ -42,6 +46,29 @@ def add_client():
     flash(f"✅ Client '{name}' added successfully!", "success")
     return redirect(url_for("dash_bp.dashboard"))
 
+# ==========================
+# Bulk import clients (CSV / NDJSON / JSON)
+# ==========================
+@dash_bp.route("/import_clients", methods=["POST"])
+@login_required
+def import_clients_upload():
+    upload = request.files.get("file")
+    fmt = detect_format(upload.filename, upload.mimetype) if upload else None
+    if not upload or not fmt:
+        flash("❌ Please choose a .csv, .ndjson or .json file to import.", "danger")
+        return redirect(url_for("dash_bp.dashboard"))
+
+    report = import_clients(upload.stream, fmt)
+    if "fatal_error" in report:
+        flash(f"❌ Import stopped: {report['fatal_error']}", "danger")
+    flash(
+        f"📥 Imported {report['inserted']} client(s), rejected {report['rejected']}.",
+        "success" if report["inserted"] else "warning",
+    )
+    for error in report["errors"][:5]:
+        flash(f"Row {error['row']}: {error['error']}", "warning")
+    return redirect(url_for("dash_bp.dashboard"))
+
 # ==========================
 # Delete client
 # ==========================
@@ -60,7 +87,7 @@ def delete_client(client_id):
 @dash_bp.route("/client/<int:client_id>")
 @login_required
 def client_details(client_id):
-    client = Client.query.get_or_404(client_id)
+    client = load_client_details(client_id)
     return render_template("client_details.html", client=client)
 
 # ==========================
@@ -69,12 +96,8 @@ def client_details(client_id):
 @dash_bp.route("/analyze", methods=["POST"])
 @login_required
 def analyze_cases():
-    clients = Client.query.all()
-    for client in clients:
-        analysis_result = analyze_client_cases(client)
-        new_update = CaseUpdate(client_id=client.id, summary=analysis_result)
-        db.session.add(new_update)
-    db.session.commit()
+    # Runs in the background; the dashboard polls /api/jobs/<id> for progress
+    job = enqueue_analysis_job(only_changed=False)
 
-    flash("🤖 AI analysis completed for all clients!", "success")
-    return redirect(url_for("dash_bp.dashboard"))
+    flash(f"🤖 AI analysis started for all clients (job #{job.id}).", "success")
+    return redirect(url_for("dash_bp.dashboard", job=job.id))
@@ -1,12 +1,34 @@
 import os
+import json
+import asyncio
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from openai import OpenAI
+from sqlalchemy import or_
+from extensions import db
+from models import Client, Message, AnalysisWatermark, CaseUpdate
+from services.llm_cache import get_llm_cache
+from services.dashboard_queries import latest_messages_by_client
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 client = None
 
+OPENAI_MODEL = "gpt-4o-mini"
+CASE_HISTORY_LIMIT = int(os.getenv("AI_CASE_HISTORY_LIMIT", "20"))
+AI_ANALYSIS_CONCURRENCY = int(os.getenv("AI_ANALYSIS_CONCURRENCY", "8"))
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "60"))
+AI_ENGINE = os.getenv("AI_ENGINE", "threads").lower()  # "threads" or "async"
+
+# Batched analysis: several clients per structured-JSON request (see complete_case_prompts)
+AI_BATCH_MODE = os.getenv("AI_BATCH_MODE", "false").lower() == "true"
+AI_BATCH_TOKEN_BUDGET = int(os.getenv("AI_BATCH_TOKEN_BUDGET", "6000"))  # estimated prompt tokens per request
+AI_BATCH_MAX_CLIENTS = int(os.getenv("AI_BATCH_MAX_CLIENTS", "20"))
+AI_BATCH_OUTPUT_TOKENS = int(os.getenv("AI_BATCH_OUTPUT_TOKENS", "250"))  # completion tokens allowed per client
+
 def init_openai():
     """Initialize the OpenAI client safely."""
     global client
@@ -25,6 +47,79 @@ def init_openai():
 
     return client
 
+def chat_request(prompt, system_prompt=None, temperature=0.7, max_tokens=None, model=OPENAI_MODEL,
+                 response_format=None):
+    """Keyword arguments for chat.completions.create; None options keep the API defaults."""
+    messages = [{"role": "user", "content": prompt}]
+    if system_prompt:
+        messages.insert(0, {"role": "system", "content": system_prompt})
+    options = {"temperature": temperature, "max_tokens": max_tokens, "response_format": response_format}
+    return {"model": model, "messages": messages, **{k: v for k, v in options.items() if v is not None}}
+
+def complete_prompt(prompt: str, system_prompt=None, temperature=0.7, max_tokens=None,
+                    model=OPENAI_MODEL, timeout: float = AI_REQUEST_TIMEOUT, response_format=None):
+    """
+    Send a prompt to the OpenAI model and return the text, raising on failure.
+    Identical requests are answered from the LLM response cache when enabled.
+    """
+    global client
+
+    cache = get_llm_cache()
+    if cache is not None:
+        cache_key = cache.make_key(model, system_prompt, prompt, temperature, max_tokens, response_format)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if client is None:
+        init_openai()
+    if client is None:
+        raise RuntimeError("OpenAI client not initialized. Please check your API key.")
+
+    response = client.chat.completions.create(
+        timeout=timeout,
+        **chat_request(prompt, system_prompt, temperature, max_tokens, model, response_format),
+    )
+    text = response.choices[0].message.content.strip()
+
+    if cache is not None:
+        cache.set(cache_key, text)
+    return text
+
+def complete_prompts(prompts, max_workers=None, timeout=None, **options):
+    """
+    Run a {key: prompt} mapping through the model on a bounded thread pool.
+
+    At most `max_workers` requests are in flight at once and each one is
+    bounded by `timeout` seconds. Returns {key: text}; keys whose call failed
+    or timed out map to None. Workers only do network I/O, never DB access.
+    `options` (system_prompt, temperature, ...) apply to every call.
+    With AI_ENGINE=async the calls run on an asyncio loop instead (see
+    services/async_engine.py).
+    """
+    if not prompts:
+        return {}
+    timeout = timeout or AI_REQUEST_TIMEOUT
+    if AI_ENGINE == "async":
+        # One event loop fans out every request; the semaphore replaces the pool
+        from services.async_engine import acomplete_prompts
+        return asyncio.run(acomplete_prompts(prompts, concurrency=max_workers, timeout=timeout, **options))
+    max_workers = max_workers or AI_ANALYSIS_CONCURRENCY
+
+    # Create the shared client up front so workers don't race to initialize it
+    if client is None:
+        init_openai()
+
+    def run(key, prompt):
+        try:
+            return key, complete_prompt(prompt, timeout=timeout, **options)
+        except Exception as e:
+            logger.error(f"❌ OpenAI request {key} failed: {e}")
+            return key, None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+        return dict(pool.map(lambda item: run(*item), prompts.items()))
+
 def ask_openai(prompt: str):
     """Send a prompt to the OpenAI model and return the response text."""
     global client
@@ -35,41 +130,241 @@ def ask_openai(prompt: str):
         return "⚠️ OpenAI client not initialized. Please check your API key."
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-        )
-        return response.choices[0].message.content.strip()
+        return complete_prompt(prompt)
     except Exception as e:
         logger.error(f"❌ OpenAI API error: {e}")
         return f"⚠️ Error communicating with AI: {e}"
 # ======================================================
-# ✅ Compatibility wrapper for scheduler integration
+# ✅ Incremental case analysis
 # ======================================================
-def analyze_all_client_cases():
-    """Wrapper to maintain backward compatibility with scheduler."""
-    from services.mycase_api import get_all_client_data  # adjust if different
-    from services.notifications import notify_client     # adjust if different
+def case_history(client):
+    """The client's most recent messages, oldest first, one line each."""
+    messages = (
+        Message.query.filter_by(client_id=client.id)
+        .order_by(Message.created_at.desc())
+        .limit(CASE_HISTORY_LIMIT)
+        .all()
+    )
+    return format_case_history(messages)
 
-    try:
-        logger.info("🔄 Running case analysis for all clients...")
-        clients = get_all_client_data()
-        if not clients:
-            logger.warning("No clients found to analyze.")
-            return
+def case_histories(clients):
+    """{client_id: case_history(client)} for many clients in one windowed query."""
+    latest = latest_messages_by_client([c.id for c in clients], CASE_HISTORY_LIMIT)
+    return {c.id: format_case_history(latest.get(c.id, [])) for c in clients}
 
-        for client in clients:
-            result = analyze_client_case(client)
-            logger.info(f"✅ Analysis complete for client: {client.get('name', 'Unknown')}")
-            notify_client(client, result)
+def format_case_history(messages):
+    """One line per message, oldest first; `messages` are newest first."""
+    return "\n".join(
+        f"- [{m.created_at:%Y-%m-%d %H:%M}] {m.message}" for m in reversed(messages)
+    ) or "No case activity recorded yet."
 
-    except Exception as e:
-        logger.error(f"❌ Failed to analyze all client cases: {e}")
+def build_case_prompt(client, history=None):
+    """Build the analysis prompt for a client from their most recent messages."""
+    if history is None:
+        history = case_history(client)
+    return (
+        f"Summarize the current status of the legal case for client {client.name} "
+        f"and point out anything the client should be told.\n\nCase activity:\n{history}"
+    )
+
+def content_fingerprint(prompt):
+    """Stable hash of the prompt text, used to skip re-analyzing unchanged cases."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+def get_changed_clients():
+    """
+    Return the clients that need a new analysis: never analyzed, or with
+    messages newer than their watermark. Runs as a single query.
+    """
+    new_activity = (
+        db.select(Message.id)
+        .where(Message.client_id == Client.id, Message.created_at > AnalysisWatermark.analyzed_at)
+        .exists()
+    )
+    return (
+        Client.query.outerjoin(AnalysisWatermark, AnalysisWatermark.client_id == Client.id)
+        .filter(or_(AnalysisWatermark.client_id.is_(None), new_activity))
+        .all()
+    )
+
+def record_analysis(client, summary, fingerprint, analyzed_at=None):
+    """Stage a CaseUpdate and advance the client's watermark. The caller commits."""
+    db.session.add(CaseUpdate(client_id=client.id, summary=summary))
+    advance_watermark(client, fingerprint, analyzed_at)
+
+def advance_watermark(client, fingerprint, analyzed_at=None):
+    """
+    Mark the client as analyzed for the given prompt fingerprint.
+
+    `analyzed_at` should be when the prompt's messages were read (default:
+    now). Messages created after it, e.g. while the model call was in
+    flight, then still count as new activity.
+    """
+    watermark = db.session.get(AnalysisWatermark, client.id)
+    if watermark is None:
+        watermark = AnalysisWatermark(client_id=client.id)
+        db.session.add(watermark)
+    watermark.analyzed_at = analyzed_at or datetime.utcnow()
+    watermark.content_hash = fingerprint
+
+def analyze_all_client_cases(only_changed=True, max_workers=None, on_result=None):
+    """
+    Analyze clients and store each result as a CaseUpdate.
+
+    By default only clients with new activity since their watermark are sent
+    to the model. Must run inside an app context. Returns the (client, summary)
+    pairs that produced a new CaseUpdate.
+    """
+    clients = get_changed_clients() if only_changed else Client.query.all()
+    logger.info(f"🔄 Running case analysis for {len(clients)} client(s)...")
+    return analyze_clients(clients, only_changed=only_changed, max_workers=max_workers, on_result=on_result)
+
+def analyze_clients(clients, only_changed=True, max_workers=None, on_result=None):
+    """
+    Analyze the given clients and store each result as a CaseUpdate.
+
+    When `only_changed` is set, clients whose prompt hash matches their
+    watermark are skipped. Model calls run concurrently (see complete_prompts)
+    and all results are committed in one transaction; `on_result(client,
+    summary)` is called for each result before that commit, so anything it
+    adds to the session is saved atomically with the analysis.
+    """
+    # Build prompts on this thread, since it owns the DB session
+    pending = {}
+    for client in clients:
+        read_at = datetime.utcnow()  # the watermark covers activity up to here, not up to the model's answer
+        history = case_history(client)
+        prompt = build_case_prompt(client, history)
+        fingerprint = content_fingerprint(prompt)
+
+        watermark = client.analysis_watermark
+        if only_changed and watermark and watermark.content_hash == fingerprint:
+            advance_watermark(client, fingerprint, read_at)
+            continue
+        pending[client.id] = (client, prompt, fingerprint, history, read_at)
+
+    summaries = complete_case_prompts(
+        {client_id: (client.name, history, prompt) for client_id, (client, prompt, _, history, _) in pending.items()},
+        max_workers=max_workers,
+    )
+
+    results = []
+    for client_id, (client, _, fingerprint, _, read_at) in pending.items():
+        summary = summaries.get(client_id)
+        if summary is None:
+            # Leave the watermark alone so the client is retried next pass
+            continue
+        record_analysis(client, summary, fingerprint, read_at)
+        if on_result is not None:
+            on_result(client, summary)
+        results.append((client, summary))
+
+    db.session.commit()
+    logger.info(f"✅ Analysis complete for {len(results)}/{len(pending)} client(s).")
+    return results
+
+# ======================================================
+# 📦 Batched multi-client analysis
+# ======================================================
+BATCH_SYSTEM_PROMPT = (
+    "You are a legal case assistant. The user message is a JSON array of cases, each with an id, "
+    "the client's name and their recent case activity. For every case, summarize the current status "
+    "of the legal case and point out anything the client should be told. Reply with a JSON object "
+    '{"results": [{"id": "<case id>", "summary": "<summary>"}]} holding exactly one result per case.'
+)
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) for budgeting batches."""
+    return len(text) // 4 + 1
+
+def pack_batches(entries, budget=AI_BATCH_TOKEN_BUDGET, max_clients=AI_BATCH_MAX_CLIENTS):
+    """Group {key: case JSON} into lists of keys, each fitting the prompt token budget."""
+    budget -= estimate_tokens(BATCH_SYSTEM_PROMPT)
+    batches, current, used = [], [], 0
+    for key, entry in entries.items():
+        cost = estimate_tokens(entry)
+        if current and (used + cost > budget or len(current) >= max_clients):
+            batches.append(current)
+            current, used = [], 0
+        current.append(key)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_summaries(text, ids):
+    """
+    Return {id: summary} for the case ids the model answered.
+
+    Raises ValueError when the reply is not the expected JSON object; ids
+    that are missing or have an empty summary are simply left out.
+    """
+    data = json.loads(text)
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        raise ValueError("Batch reply has no results list")
+    summaries = {}
+    for item in results:
+        if not isinstance(item, dict):
+            continue
+        case_id, summary = str(item.get("id")), item.get("summary")
+        if case_id in ids and isinstance(summary, str) and summary.strip():
+            summaries[case_id] = summary.strip()
+    return summaries
+
+def complete_case_prompts(cases, max_workers=None):
+    """
+    Analyze {key: (client_name, history, single_prompt)} and return {key: summary or None}.
+
+    With AI_BATCH_MODE on, cases are packed into JSON-mode requests of up to
+    AI_BATCH_MAX_CLIENTS cases / AI_BATCH_TOKEN_BUDGET prompt tokens, so the
+    instructions are sent once per batch instead of once per client. Cases a
+    batch reply doesn't cover (bad JSON, missing id, failed request) fall
+    back to the usual single-prompt call.
+    """
+    if not AI_BATCH_MODE or len(cases) < 2:
+        return complete_prompts({key: prompt for key, (_, _, prompt) in cases.items()}, max_workers=max_workers)
+
+    entries = {
+        key: json.dumps({"id": str(key), "client": name, "activity": history}, ensure_ascii=False)
+        for key, (name, history, _) in cases.items()
+    }
+    batches = [keys for keys in pack_batches(entries) if len(keys) > 1]
+    prompts = {index: "[" + ",\n".join(entries[key] for key in keys) + "]" for index, keys in enumerate(batches)}
+    replies = complete_prompts(
+        prompts,
+        max_workers=max_workers,
+        system_prompt=BATCH_SYSTEM_PROMPT,
+        max_tokens=AI_BATCH_OUTPUT_TOKENS * max((len(keys) for keys in batches), default=1),
+        response_format={"type": "json_object"},
+    )
+
+    summaries = {}
+    for index, keys in enumerate(batches):
+        reply = replies.get(index)
+        if reply is None:
+            continue
+        try:
+            parsed = parse_batch_summaries(reply, {str(key) for key in keys})
+        except ValueError as e:
+            logger.warning(f"⚠️ Unparseable batch reply for {len(keys)} case(s), retrying them singly: {e}")
+            continue
+        summaries.update({key: parsed[str(key)] for key in keys if str(key) in parsed})
+
+    fallback = {key: prompt for key, (_, _, prompt) in cases.items() if key not in summaries}
+    if fallback:
+        summaries.update(complete_prompts(fallback, max_workers=max_workers))
+    prompt_tokens = sum(estimate_tokens(BATCH_SYSTEM_PROMPT + prompt) for prompt in prompts.values())
+    prompt_tokens += sum(estimate_tokens(prompt) for prompt in fallback.values())
+    logger.info(
+        f"📦 Analyzed {len(cases)} case(s) with {len(batches)} batched and {len(fallback)} single request(s), "
+        f"~{prompt_tokens} prompt tokens."
+    )
+    return summaries
 
-def analyze_client_cases(client_id):
+def analyze_client_cases(client):
     """
     Compatibility wrapper for dashboard imports.
-    Runs AI analysis for a specific client ID using analyze_all_client_cases().
+    Runs AI analysis for a single client and returns the summary text.
     """
-    return analyze_all_client_cases(client_id=client_id)
+    return ask_openai(build_case_prompt(client))
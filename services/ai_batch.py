@@ -0,0 +1,244 @@
+import os
+import json
+import logging
+import tempfile
+from datetime import datetime
+from sqlalchemy import insert
+from extensions import db
+from models import AIBatchRun, AnalysisWatermark, CaseUpdate, Client
+from services import ai_agent
+from services.ai_agent import (
+    build_case_prompt, case_histories, chat_request, content_fingerprint, get_changed_clients,
+)
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+# Nightly re-analysis through the OpenAI Batch API: results arrive within the
+# completion window instead of seconds, at half the per-token price and
+# outside the synchronous rate limits.
+AI_NIGHTLY_BATCH = os.getenv("AI_NIGHTLY_BATCH", "false").lower() == "true"
+AI_NIGHTLY_BATCH_HOUR = int(os.getenv("AI_NIGHTLY_BATCH_HOUR", "2"))  # server local time
+AI_NIGHTLY_BATCH_ONLY_CHANGED = os.getenv("AI_NIGHTLY_BATCH_ONLY_CHANGED", "false").lower() == "true"
+AI_BATCH_POLL_INTERVAL = int(os.getenv("AI_BATCH_POLL_INTERVAL", "300"))  # seconds between status checks
+AI_BATCH_MAX_REQUESTS = int(os.getenv("AI_BATCH_MAX_REQUESTS", "50000"))  # Batch API limit per input file
+AI_BATCH_COMPLETION_WINDOW = "24h"
+AI_BATCH_ENDPOINT = "/v1/chat/completions"
+STORE_CHUNK_SIZE = 500
+PROMPT_CHUNK_SIZE = 500  # clients loaded (and case histories queried) at a time while writing the input file
+
+# Provider statuses after which a batch will not change any more
+FINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def _openai():
+    client = ai_agent.client or ai_agent.init_openai()
+    if client is None:
+        raise RuntimeError("OpenAI client not initialized. Please check your API key.")
+    return client
+
+def _custom_id(client_id):
+    return f"client-{client_id}"
+
+# =====================================================
+# 📤 Submission
+# =====================================================
+def submit_analysis_batch(only_changed=AI_NIGHTLY_BATCH_ONLY_CHANGED):
+    """
+    Write one JSONL request per client and submit it to the Batch API.
+
+    Clients are loaded and their prompts built PROMPT_CHUNK_SIZE at a time,
+    with one windowed query for the case histories of each chunk, and
+    streamed to a temporary file. More than AI_BATCH_MAX_REQUESTS clients
+    are split over several batches. Must run inside an app context.
+    Returns the new AIBatchRun rows.
+    """
+    if only_changed:
+        client_ids = [client.id for client in get_changed_clients()]
+    else:
+        client_ids = [row[0] for row in db.session.query(Client.id).order_by(Client.id)]
+    runs = []
+    for start in range(0, len(client_ids), AI_BATCH_MAX_REQUESTS):
+        runs.append(_submit_chunk(client_ids[start:start + AI_BATCH_MAX_REQUESTS]))
+    if runs:
+        logger.info(f"📤 Submitted {len(client_ids)} client prompt(s) in {len(runs)} batch(es).")
+    return runs
+
+def _submit_chunk(client_ids):
+    # Watermarks advance to this moment, so activity after it is picked up by the next pass
+    submitted_at = datetime.utcnow()
+    manifest = {}
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8", delete=False) as handle:
+        path = handle.name
+        for start in range(0, len(client_ids), PROMPT_CHUNK_SIZE):
+            chunk = client_ids[start:start + PROMPT_CHUNK_SIZE]
+            clients = Client.query.filter(Client.id.in_(chunk)).order_by(Client.id).all()
+            histories = case_histories(clients)
+            for client in clients:
+                prompt = build_case_prompt(client, histories[client.id])
+                manifest[str(client.id)] = content_fingerprint(prompt)
+                handle.write(json.dumps({
+                    "custom_id": _custom_id(client.id),
+                    "method": "POST",
+                    "url": AI_BATCH_ENDPOINT,
+                    "body": chat_request(prompt),
+                }, ensure_ascii=False) + "\n")
+
+    openai = _openai()
+    try:
+        with open(path, "rb") as upload:
+            input_file = openai.files.create(file=upload, purpose="batch")
+    finally:
+        os.remove(path)
+    batch = openai.batches.create(
+        input_file_id=input_file.id,
+        endpoint=AI_BATCH_ENDPOINT,
+        completion_window=AI_BATCH_COMPLETION_WINDOW,
+        metadata={"source": "casepulse-nightly-analysis"},
+    )
+
+    run = AIBatchRun(
+        batch_id=batch.id,
+        input_file_id=input_file.id,
+        provider_status=batch.status,
+        manifest=json.dumps(manifest),
+        total_requests=len(manifest),
+        created_at=submitted_at,
+    )
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+# =====================================================
+# 📥 Polling and results
+# =====================================================
+def poll_batch_runs():
+    """
+    Check every open batch run and store the results of finished ones.
+
+    Each run commits or rolls back on its own, so one that fails to load
+    is retried next tick without holding up the others. Must run inside an
+    app context. Returns the runs that were checked.
+    """
+    open_runs = db.session.query(AIBatchRun.id).filter_by(status="submitted").order_by(AIBatchRun.id)
+    run_ids = [row[0] for row in open_runs]
+    runs = []
+    for run_id in run_ids:
+        run = db.session.get(AIBatchRun, run_id)
+        try:
+            batch = _openai().batches.retrieve(run.batch_id)
+            run.provider_status = batch.status
+            run.checked_at = datetime.utcnow()
+            if batch.status in FINAL_BATCH_STATUSES:
+                finish_batch_run(run, batch)
+            db.session.commit()
+            runs.append(run)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Could not check batch run #{run_id}: {e}")
+    return runs
+
+def finish_batch_run(run, batch):
+    """Store the summaries of a finished batch (expired/cancelled ones may be partial)."""
+    run.output_file_id = batch.output_file_id
+    run.error_file_id = batch.error_file_id
+    summaries = {}
+    if batch.output_file_id:
+        summaries = read_batch_output(_openai().files.content(batch.output_file_id).text)
+    stored = store_batch_results(run, summaries)
+
+    # Clients without a summary keep their old watermark and are retried by a later pass
+    run.succeeded_requests = stored
+    run.failed_requests = run.total_requests - len(summaries)
+    run.status = "completed" if batch.status == "completed" else "failed"
+    if batch.status != "completed":
+        errors = getattr(batch.errors, "data", None) or []
+        run.error = "; ".join(e.message for e in errors if e.message) or f"Batch {batch.status}"
+    run.finished_at = datetime.utcnow()
+    logger.info(
+        f"📥 Batch {run.batch_id} {batch.status}: {stored} stored, "
+        f"{run.failed_requests} failed of {run.total_requests}."
+    )
+
+def read_batch_output(text):
+    """Parse a Batch API output file into {client_id: summary}, skipping failed requests."""
+    summaries = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        custom_id = None
+        try:
+            item = json.loads(line)
+            custom_id = item["custom_id"]
+            response = item.get("response") or {}
+            client_id = int(custom_id.removeprefix("client-"))
+            if response.get("status_code") != 200:
+                raise ValueError(item.get("error") or f"HTTP {response.get('status_code')}")
+            summaries[client_id] = response["body"]["choices"][0]["message"]["content"].strip()
+        except json.JSONDecodeError as e:
+            # A truncated or corrupt line only costs that one request
+            logger.warning(f"⚠️ Unreadable batch output line: {e}")
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"⚠️ Batch request {custom_id} failed: {e}")
+    return summaries
+
+def store_batch_results(run, summaries):
+    """
+    Bulk-insert CaseUpdates and advance watermarks to the submission time.
+
+    A client whose watermark is newer than the submission was re-analyzed
+    live in the meantime; its (older) batch result is dropped. The caller
+    commits.
+    """
+    manifest = json.loads(run.manifest)
+    client_ids = list(summaries)
+    watermarks, existing = {}, set()
+    for start in range(0, len(client_ids), STORE_CHUNK_SIZE):  # keep IN (...) under SQLite's variable limit
+        chunk = client_ids[start:start + STORE_CHUNK_SIZE]
+        watermarks.update(
+            (w.client_id, w) for w in AnalysisWatermark.query.filter(AnalysisWatermark.client_id.in_(chunk))
+        )
+        existing.update(row[0] for row in db.session.query(Client.id).filter(Client.id.in_(chunk)))
+
+    rows = []
+    for client_id, summary in summaries.items():
+        watermark = watermarks.get(client_id)
+        if client_id not in existing or (watermark and watermark.analyzed_at > run.created_at):
+            continue
+        if watermark is None:
+            watermark = AnalysisWatermark(client_id=client_id)
+            db.session.add(watermark)
+        watermark.analyzed_at = run.created_at
+        watermark.content_hash = manifest.get(str(client_id))
+        rows.append({"client_id": client_id, "summary": summary})
+
+    if rows:
+        db.session.execute(insert(CaseUpdate), rows)
+    return len(rows)
+
+# =====================================================
+# 🕒 Scheduler entry points
+# =====================================================
+def run_nightly_batch():
+    """Scheduler entry point for submit_analysis_batch()."""
+    from start_app import app
+    with app.app_context():
+        try:
+            if AIBatchRun.query.filter_by(status="submitted").first() is not None:
+                logger.info("ℹ️ Previous analysis batch still running; skipping tonight's submission.")
+                return
+            submit_analysis_batch()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Batch submission failed: {e}")
+
+def run_batch_poller():
+    """Scheduler entry point for poll_batch_runs()."""
+    from start_app import app
+    with app.app_context():
+        try:
+            poll_batch_runs()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Batch polling failed: {e}")
@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import logging
+import httpx
+from openai import AsyncOpenAI
+from services.ai_agent import OPENAI_MODEL, AI_REQUEST_TIMEOUT, chat_request
+from services.llm_cache import get_llm_cache
+from services.http_client import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+from services.notifications import GRAPH_API_BASE, GRAPH_BATCH_LIMIT, build_mail_batch, read_mail_batch_response
+from services.rate_limit import (
+    RATE_LIMIT_MAX_THROTTLES, RATE_LIMIT_MAX_WAIT, RATE_LIMIT_POLL, RateLimited, get_rate_limiter, parse_retry_after,
+)
+from services.ringcentral_session import SMS_ENDPOINT
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+# Selected by AI_ENGINE=async (services/ai_agent.py) and NOTIFY_ENGINE=async
+# (services/outbox.py). Each run is one asyncio.run() on the calling thread;
+# the semaphores bound how many requests are in flight at once.
+NOTIFY_ENGINE = os.getenv("NOTIFY_ENGINE", "threads").lower()  # "threads" or "async"
+ASYNC_AI_CONCURRENCY = int(os.getenv("ASYNC_AI_CONCURRENCY", "64"))
+ASYNC_SMS_CONCURRENCY = int(os.getenv("ASYNC_SMS_CONCURRENCY", "32"))
+ASYNC_EMAIL_CONCURRENCY = int(os.getenv("ASYNC_EMAIL_CONCURRENCY", "16"))  # each one a Graph $batch of up to 20
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "100"))
+
+def _http_client():
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=ASYNC_HTTP_MAX_CONNECTIONS),
+    )
+
+async def wait_for_tokens(limiter, provider, cost=1, max_wait=RATE_LIMIT_MAX_WAIT):
+    """
+    Async counterpart of ProviderRateLimiter.acquire: sleeps on the loop, not
+    the thread. The limiter state lives in a SQLite file, so each attempt
+    runs in a worker thread.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = await asyncio.to_thread(limiter.try_acquire, provider, cost)
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimited(f"{provider}: no capacity within {max_wait:.0f}s")
+        await asyncio.sleep(min(wait, RATE_LIMIT_POLL))
+
+# =====================================================
+# 🤖 OpenAI
+# =====================================================
+async def acomplete_prompts(prompts, concurrency=None, timeout=None, system_prompt=None,
+                            temperature=0.7, max_tokens=None, model=OPENAI_MODEL, response_format=None):
+    """
+    Async counterpart of ai_agent.complete_prompts: {key: prompt} -> {key: text or None}.
+
+    Cached responses are served without a request, the rest run through one
+    AsyncOpenAI client with at most `concurrency` calls in flight. Cache
+    reads and writes are blocking and run in worker threads.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("❌ Missing OPENAI_API_KEY in environment variables.")
+        return {key: None for key in prompts}
+
+    cache = get_llm_cache()
+    semaphore = asyncio.Semaphore(concurrency or ASYNC_AI_CONCURRENCY)
+    client = AsyncOpenAI(api_key=api_key, http_client=_http_client())
+
+    async def complete(key, prompt):
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(model, system_prompt, prompt, temperature, max_tokens, response_format)
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                return key, cached
+        async with semaphore:
+            try:
+                response = await client.chat.completions.create(
+                    timeout=timeout or AI_REQUEST_TIMEOUT,
+                    **chat_request(prompt, system_prompt, temperature, max_tokens, model, response_format),
+                )
+            except Exception as e:
+                logger.error(f"❌ OpenAI request {key} failed: {e}")
+                return key, None
+        text = response.choices[0].message.content.strip()
+        if cache is not None:
+            await asyncio.to_thread(cache.set, cache_key, text)
+        return key, text
+
+    try:
+        return dict(await asyncio.gather(*(complete(key, prompt) for key, prompt in prompts.items())))
+    finally:
+        await client.close()
+
+# =====================================================
+# 📲 RingCentral SMS
+# =====================================================
+async def asend_sms(http, session, from_number, to_number, text, semaphore):
+    """
+    Send one SMS over httpx with the shared session's access token.
+
+    Login/refresh stays on the blocking RingCentralSession (run in a worker
+    thread, and only when the token is due). Returns None on success or an
+    error string.
+    """
+    limiter = get_rate_limiter()
+    body = {"from": {"phoneNumber": from_number}, "to": [{"phoneNumber": to_number}], "text": text}
+    reauthenticated = False
+
+    async with semaphore:
+        for _ in range(RATE_LIMIT_MAX_THROTTLES + 1):
+            try:
+                if limiter is not None:
+                    await wait_for_tokens(limiter, "ringcentral_sms")
+                platform = await asyncio.to_thread(session.platform)
+                response = await http.post(
+                    f"{session.server_url.rstrip('/')}{SMS_ENDPOINT}",
+                    json=body,
+                    headers={"Authorization": f"Bearer {platform.auth().access_token()}"},
+                )
+            except Exception as e:
+                return str(e) or e.__class__.__name__
+
+            if response.status_code == 401 and not reauthenticated:
+                reauthenticated = True
+                session.reset()
+                continue
+            if response.status_code == 429:
+                retry_after = response.headers.get("Retry-After")
+                if limiter is not None:
+                    await asyncio.to_thread(limiter.throttled, "ringcentral_sms", retry_after)
+                else:
+                    await asyncio.sleep(parse_retry_after(retry_after))
+                continue
+            if response.is_success:
+                if limiter is not None:
+                    await asyncio.to_thread(limiter.succeeded, "ringcentral_sms")
+                return None
+            return f"HTTP {response.status_code}: {response.text[:200]}"
+    return f"RingCentral kept rate limiting the SMS to {to_number}"
+
+# =====================================================
+# 📧 Graph sendMail
+# =====================================================
+async def asend_email_chunk(http, provider, sender, chunk, semaphore, save_to_sent_items=None):
+    """Async counterpart of notifications._send_mail_batch for one chunk of up to 20 emails."""
+    limiter = get_rate_limiter()
+    results = {}
+    pending = list(chunk)
+
+    async with semaphore:
+        for _ in range(RATE_LIMIT_MAX_THROTTLES + 1):
+            try:
+                if limiter is not None:
+                    await wait_for_tokens(limiter, "graph_mail", cost=len(pending))
+                token = await asyncio.to_thread(provider.get_token)
+                if not token:
+                    raise RuntimeError("No Outlook access token")
+                response = await http.post(
+                    f"{GRAPH_API_BASE}/$batch",
+                    headers={"Authorization": f"Bearer {token}"},
+                    json=build_mail_batch(pending, sender, save_to_sent_items),
+                )
+                if response.status_code == 401:
+                    provider.invalidate()
+                # A 200 with an unreadable body fails this chunk, not the whole gather()
+                payload = response.json() if response.status_code == 200 else None
+            except Exception as e:
+                status = 429 if isinstance(e, RateLimited) else 0
+                results.update({key: {"ok": False, "status": status, "error": str(e) or e.__class__.__name__}
+                                for key, *_ in pending})
+                return results
+
+            results.update(read_mail_batch_response(pending, response.status_code, response.headers, payload))
+
+            throttled = [email for email in pending if results[email[0]]["status"] == 429]
+            if limiter is not None and any(results[key]["ok"] for key, *_ in pending):
+                await asyncio.to_thread(limiter.succeeded, "graph_mail")
+            if not throttled:
+                break
+            retry_after = max((results[key].get("retry_after") for key, *_ in throttled), key=parse_retry_after)
+            if limiter is not None:
+                await asyncio.to_thread(limiter.throttled, "graph_mail", retry_after)
+            else:
+                await asyncio.sleep(parse_retry_after(retry_after))
+            pending = throttled
+    return results
+
+# =====================================================
+# 📬 Outbox fan-out
+# =====================================================
+async def asend_outbox_messages(messages):
+    """
+    Send outbox messages ({id, channel, recipient, subject, body} dicts)
+    concurrently from a single thread. Returns {id: error or None}, the same
+    shape as the thread-pool senders in services/outbox.py.
+    """
+    from services.scheduler import (
+        OUTLOOK_ADMIN_EMAIL, RINGCENTRAL_USERNAME, get_admin_sms_session, get_admin_token_provider,
+    )
+    sms = [m for m in messages if m["channel"] == "sms"]
+    emails = [(m["id"], m["recipient"], m["subject"], m["body"]) for m in messages if m["channel"] == "email"]
+
+    async with _http_client() as http:
+        tasks = []
+        if sms:
+            session = get_admin_sms_session()
+            sms_slots = asyncio.Semaphore(ASYNC_SMS_CONCURRENCY)
+            tasks += [_keyed(m["id"], asend_sms(http, session, RINGCENTRAL_USERNAME, m["recipient"], m["body"], sms_slots))
+                      for m in sms]
+        outcomes = {}
+        if emails:
+            try:
+                provider = await asyncio.to_thread(get_admin_token_provider)
+            except Exception as e:
+                provider = None
+                outcomes.update({key: str(e) or e.__class__.__name__ for key, *_ in emails})
+            if provider is not None:
+                email_slots = asyncio.Semaphore(ASYNC_EMAIL_CONCURRENCY)
+                tasks += [
+                    _email_errors(asend_email_chunk(http, provider, OUTLOOK_ADMIN_EMAIL,
+                                                    emails[start:start + GRAPH_BATCH_LIMIT], email_slots,
+                                                    save_to_sent_items=True))
+                    for start in range(0, len(emails), GRAPH_BATCH_LIMIT)
+                ]
+
+        for result in await asyncio.gather(*tasks):
+            outcomes.update(result)
+    return outcomes
+
+async def _keyed(key, coro):
+    return {key: await coro}
+
+async def _email_errors(coro):
+    return {key: None if result["ok"] else result["error"] for key, result in (await coro).items()}
@@ -0,0 +1,170 @@
+import io
+import os
+import re
+import csv
+import json
+import logging
+from sqlalchemy import insert
+from extensions import db
+from models import Client
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("CLIENT_IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("CLIENT_IMPORT_MAX_ERRORS", "1000"))  # per-row errors kept in the report
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+JSON_CHUNK_SIZE = 64 * 1024
+
+# =====================================================
+# 📄 Streaming row readers
+# =====================================================
+# Each reader yields (row_number, row) where row is a dict, or an Exception
+# for a row that could not be parsed. Nothing is buffered beyond one chunk.
+
+def iter_csv_rows(text):
+    reader = csv.DictReader(text)
+    for row_number, row in enumerate(reader, start=2):  # row 1 is the header
+        yield row_number, row
+
+def iter_ndjson_rows(text):
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+
+def iter_json_array_rows(text):
+    """Decode a top-level JSON array one element at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof, row_number = "", 0, False, 0
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = text.read(JSON_CHUNK_SIZE)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    fill()
+    buf = buf.lstrip()
+    if not buf.startswith("["):
+        raise ValueError("JSON upload must be an array of client objects")
+    pos = 1
+
+    while True:
+        # Skip separators, topping the buffer up as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            fill()
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of JSON array")
+        if buf[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise ValueError(f"Malformed JSON at element {row_number + 1}")
+            fill()
+            continue
+        row_number += 1
+        pos = end
+        yield row_number, obj
+
+def iter_rows(stream, fmt):
+    """Pick a reader for `fmt` ("csv", "ndjson" or "json") over a binary stream."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        return iter_csv_rows(text)
+    if fmt == "ndjson":
+        return iter_ndjson_rows(text)
+    if fmt == "json":
+        return iter_json_array_rows(text)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+def detect_format(filename=None, content_type=None):
+    """Guess the upload format from its file extension, then its content type."""
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    if name.endswith(".json") or "json" in content_type:
+        return "json"
+    return None
+
+# =====================================================
+# ✅ Validation
+# =====================================================
+def validate_row(row):
+    """Return (values, None) for a valid row, or (None, error message)."""
+    if isinstance(row, Exception):
+        return None, f"Unparseable row: {row}"
+    if not isinstance(row, dict):
+        return None, "Row must be an object with name/email/phone fields"
+
+    row = {str(k).strip().lower(): ("" if v is None else str(v).strip()) for k, v in row.items() if k is not None}
+    name, email, phone = row.get("name", ""), row.get("email", ""), row.get("phone", "")
+
+    if not name or not email:
+        return None, "Missing client name or email"
+    if len(name) > 120:
+        return None, "Name longer than 120 characters"
+    if len(email) > 120 or not EMAIL_RE.match(email):
+        return None, f"Invalid email: {email!r}"
+    if len(phone) > 50:
+        return None, "Phone longer than 50 characters"
+    return {"name": name, "email": email, "phone": phone or None}, None
+
+# =====================================================
+# 📥 Batched import
+# =====================================================
+def import_clients(stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Stream-parse an upload and insert valid clients in batches.
+
+    Rows are inserted with one executemany INSERT and committed every
+    `batch_size` rows, so memory stays bounded by a single batch. Invalid rows
+    are skipped and reported; a file-level parse error stops the import but
+    keeps the batches already committed.
+    """
+    report = {"inserted": 0, "rejected": 0, "errors": [], "errors_truncated": False}
+    batch = []
+
+    def flush():
+        if batch:
+            db.session.execute(insert(Client), batch)
+            db.session.commit()
+            report["inserted"] += len(batch)
+            batch.clear()
+
+    def reject(row_number, error):
+        report["rejected"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    try:
+        for row_number, row in iter_rows(stream, fmt):
+            values, error = validate_row(row)
+            if error:
+                reject(row_number, error)
+                continue
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        report["fatal_error"] = str(e)
+
+    logger.info(f"📥 Client import: {report['inserted']} inserted, {report['rejected']} rejected.")
+    return report
@@ -0,0 +1,107 @@
+import os
+from collections import defaultdict
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, selectinload
+from extensions import db
+from models import Client, CaseUpdate, Message
+from utils.helpers import encode_cursor, decode_cursor
+
+# How many AI summaries to show under each client, and in the "recent" panels
+DASHBOARD_UPDATES_PER_CLIENT = int(os.getenv("DASHBOARD_UPDATES_PER_CLIENT", "5"))
+DASHBOARD_RECENT_LIMIT = int(os.getenv("DASHBOARD_RECENT_LIMIT", "5"))
+
+CLIENT_PAGE_SIZE = int(os.getenv("CLIENT_PAGE_SIZE", "50"))
+CLIENT_PAGE_SIZE_MAX = int(os.getenv("CLIENT_PAGE_SIZE_MAX", "200"))
+
+# =====================================================
+# 📄 Keyset pagination
+# =====================================================
+def paginate_clients(cursor=None, limit=None):
+    """
+    Return (clients, next_cursor) for one page of clients ordered by id.
+
+    Pages are addressed by the last id seen rather than an OFFSET, so every
+    page is an index range scan and costs the same at row 100 or 100,000.
+    The sort key is the unique id alone, so the cursor needs no tie-break;
+    a different ORDER BY must put its columns plus id into the cursor.
+    next_cursor is None on the last page. Raises ValueError on a bad cursor.
+    """
+    limit = max(1, min(limit or CLIENT_PAGE_SIZE, CLIENT_PAGE_SIZE_MAX))
+    query = Client.query.order_by(Client.id)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        query = query.filter(Client.id > values[0])
+
+    # One extra row tells us whether another page exists
+    clients = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(clients[limit - 1].id) if len(clients) > limit else None
+    return clients[:limit], next_cursor
+
+# =====================================================
+# 📊 Dashboard data access (constant number of queries)
+# =====================================================
+def latest_updates_by_client(client_ids, per_client=DASHBOARD_UPDATES_PER_CLIENT):
+    """
+    Return {client_id: [CaseUpdate, ...]} with each client's newest updates.
+
+    Uses a ROW_NUMBER() window over case_updates, so any number of clients
+    costs a single query instead of one lazy load per client.
+    """
+    return latest_rows_by_client(CaseUpdate, client_ids, per_client)
+
+def latest_messages_by_client(client_ids, per_client):
+    """Return {client_id: [Message, ...]}, newest first; the same single windowed query."""
+    return latest_rows_by_client(Message, client_ids, per_client)
+
+def latest_rows_by_client(model, client_ids, per_client):
+    """Newest `per_client` rows of `model` (CaseUpdate or Message) per client, in one query."""
+    if not client_ids:
+        return {}
+
+    rank = func.row_number().over(
+        partition_by=model.client_id,
+        order_by=(model.created_at.desc(), model.id.desc()),
+    ).label("rank")
+    ranked = (
+        select(model, rank)
+        .where(model.client_id.in_(client_ids))
+        .subquery()
+    )
+    row_model = aliased(model, ranked)
+    rows = db.session.execute(
+        select(row_model)
+        .where(ranked.c.rank <= per_client)
+        .order_by(ranked.c.client_id, ranked.c.rank)
+    ).scalars()
+
+    latest = defaultdict(list)
+    for row in rows:
+        latest[row.client_id].append(row)
+    return latest
+
+def recent_case_updates(limit=DASHBOARD_RECENT_LIMIT):
+    return CaseUpdate.query.order_by(CaseUpdate.created_at.desc()).limit(limit).all()
+
+def recent_messages(limit=DASHBOARD_RECENT_LIMIT):
+    return Message.query.order_by(Message.created_at.desc()).limit(limit).all()
+
+def load_dashboard(cursor=None):
+    """Everything dashboard.html renders for one client page, loaded in four queries."""
+    clients, next_cursor = paginate_clients(cursor)
+    return {
+        "clients": clients,
+        "next_cursor": next_cursor,
+        "updates_by_client": latest_updates_by_client([c.id for c in clients]),
+        "case_updates": recent_case_updates(),
+        "messages": recent_messages(),
+    }
+
+def load_client_details(client_id):
+    """A client with its case updates and messages eagerly loaded (three queries)."""
+    return (
+        Client.query.options(selectinload(Client.case_updates), selectinload(Client.messages))
+        .filter(Client.id == client_id)
+        .first_or_404()
+    )
@@ -0,0 +1,60 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime
+from sqlalchemy import select
+from extensions import db
+from models import Client, CaseUpdate, Message
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+
+# Exportable tables and the columns written for each, in output order
+EXPORTS = {
+    "clients": [Client.id, Client.name, Client.email, Client.phone, Client.created_at],
+    "case_updates": [CaseUpdate.id, CaseUpdate.client_id, CaseUpdate.summary, CaseUpdate.created_at],
+    "messages": [Message.id, Message.client_id, Message.message, Message.created_at],
+}
+
+# =====================================================
+# 📤 Streaming export
+# =====================================================
+def iter_export_partitions(kind, yield_per=EXPORT_YIELD_PER):
+    """
+    Yield lists of at most `yield_per` rows for an export, in id order.
+
+    yield_per streams the result (a server-side cursor on PostgreSQL) and only
+    plain column tuples are selected, so no ORM objects pile up in the
+    session: memory stays flat whatever the table size.
+    """
+    columns = EXPORTS[kind]
+    result = db.session.execute(
+        select(*columns).order_by(columns[0]).execution_options(yield_per=yield_per)
+    )
+    for partition in result.partitions():
+        yield partition
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def generate_csv(kind):
+    """CSV chunks: the header goes out before the query runs, then one chunk per partition."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([column.key for column in EXPORTS[kind]])
+    yield buf.getvalue()
+
+    for partition in iter_export_partitions(kind):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_serialize(value) for value in row] for row in partition)
+        yield buf.getvalue()
+
+def generate_ndjson(kind):
+    """NDJSON chunks, one JSON object per row."""
+    keys = [column.key for column in EXPORTS[kind]]
+    for partition in iter_export_partitions(kind):
+        yield "".join(
+            json.dumps(dict(zip(keys, map(_serialize, row))), ensure_ascii=False) + "\n"
+            for row in partition
+        )
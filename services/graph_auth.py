@@ -0,0 +1,73 @@
+import os
+import time
+import logging
+import threading
+from msal import ConfidentialClientApplication
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+
+# Fetch a new token this many seconds before the current one expires
+GRAPH_TOKEN_REFRESH_MARGIN = int(os.getenv("GRAPH_TOKEN_REFRESH_MARGIN", "300"))
+
+# =====================================================
+# 🔑 Shared Microsoft Graph token provider
+# =====================================================
+class GraphTokenProvider:
+    """
+    App-only Graph access token for one tenant, shared by every thread.
+
+    Keeps a single MSAL application and reuses its token until shortly before
+    it expires. Refreshes are serialized, so concurrent senders wait for one
+    token request instead of each making their own.
+    """
+
+    def __init__(self, client_id, client_secret, authority, scopes=GRAPH_SCOPES):
+        self.client_id = client_id
+        self.authority = authority
+        self.scopes = scopes
+        self.token_requests = 0
+        self._app = ConfidentialClientApplication(
+            client_id,
+            authority=authority,
+            client_credential=client_secret,
+        )
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        """Return a valid access token, or None if Azure AD refused the request."""
+        with self._lock:
+            if self._token and self._expires_at - GRAPH_TOKEN_REFRESH_MARGIN > time.time():
+                return self._token
+
+            result = self._app.acquire_token_for_client(scopes=self.scopes)
+            self.token_requests += 1
+            if "access_token" not in result:
+                logger.error(f"❌ Outlook auth failed: {result.get('error_description')}")
+                return None
+
+            self._token = result["access_token"]
+            self._expires_at = time.time() + int(result.get("expires_in", 3600))
+            return self._token
+
+    def invalidate(self):
+        """Forget the cached token, e.g. after Graph answers 401."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_graph_token_provider(client_id, client_secret, authority):
+    """Return the process-wide token provider for this tenant/app, creating it once."""
+    key = (authority, client_id)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = GraphTokenProvider(client_id, client_secret, authority)
+            _providers[key] = provider
+        return provider
@@ -0,0 +1,72 @@
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Connection pool / timeout / retry settings
+# =====================================================
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # hosts kept per session
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # keep-alive sockets per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_RETRY_STATUSES = (500, 502, 503, 504)
+
+# =====================================================
+# 🌐 Pooled sessions
+# =====================================================
+class PooledSession(requests.Session):
+    """requests.Session that applies a default timeout to every call."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+def build_session(pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES,
+                  backoff_factor=HTTP_BACKOFF_FACTOR,
+                  timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+    """
+    Create a keep-alive session with a bounded connection pool and retry policy.
+
+    Connection failures are retried for any method, since the request never
+    reached the server. 5xx responses and read errors are only retried for
+    idempotent methods, so a POST such as sendMail is never sent twice.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=HTTP_RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = PooledSession(timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(name="default"):
+    """Return the process-wide pooled session for an integration (graph, ringcentral, ...)."""
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = build_session()
+            _sessions[name] = session
+        return session
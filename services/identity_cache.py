@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from extensions import db
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# Invalidation only reaches the process that made the change. Other workers
+# keep serving the old row (including a deleted or demoted user) for up to
+# this many seconds; 0 turns the cache off.
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "10"))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+# Changes to these columns must be seen by the very next request
+SENSITIVE_COLUMNS = ("password_hash", "role", "email")
+
+# =====================================================
+# 👤 Flask-Login identity cache
+# =====================================================
+class IdentityCache:
+    """
+    In-process TTL/LRU cache of User column values for the user_loader.
+
+    Values are cached rather than instances: every hit builds a fresh
+    detached User, so requests never share an ORM object across threads,
+    and it can still be merged back into a session if a view needs to.
+    Password, role and email changes are dropped at once in the process
+    that commits them and after at most `ttl` seconds everywhere else.
+    """
+
+    def __init__(self, ttl=IDENTITY_CACHE_TTL, max_entries=IDENTITY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            values = entry[1]
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user):
+        if self.ttl <= 0:
+            return
+        values = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+identity_cache = IdentityCache()
+
+def load_user_cached(user_id):
+    """Flask-Login user_loader body: serve from the cache, fall back to one SELECT."""
+    user_id = int(user_id)
+    user = identity_cache.get(user_id)
+    if user is not None:
+        return user
+    user = db.session.get(User, user_id)
+    if user is not None:
+        identity_cache.put(user)
+    return user
+
+# =====================================================
+# 🔄 Invalidation on password / role changes
+# =====================================================
+@event.listens_for(User, "after_update")
+def _user_updated(_mapper, _connection, target):
+    state = inspect(target)
+    if any(state.attrs[key].history.has_changes() for key in SENSITIVE_COLUMNS):
+        _invalidate_after_commit(target)
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(_mapper, _connection, target):
+    _invalidate_after_commit(target)
+
+def _invalidate_after_commit(user):
+    # Drop it now, and again once committed, in case a concurrent request
+    # re-cached the old row between the flush and the commit
+    identity_cache.invalidate(user.id)
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault("identity_invalidations", set()).add(user.id)
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session):
+    for user_id in session.info.pop("identity_invalidations", ()):
+        identity_cache.invalidate(user_id)
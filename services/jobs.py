@@ -0,0 +1,145 @@
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from extensions import db
+from models import AnalysisJob, Client
+from services.ai_agent import analyze_clients, AI_ANALYSIS_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Clients are analyzed and committed in chunks so progress is visible while a job runs
+JOB_CHUNK_SIZE = int(os.getenv("ANALYSIS_JOB_CHUNK_SIZE", str(AI_ANALYSIS_CONCURRENCY * 4)))
+# A running job renews its heartbeat after every chunk; one silent for longer
+# than this lost its worker. Must exceed the time one chunk can take.
+ANALYSIS_JOB_STALE_AFTER = int(os.getenv("ANALYSIS_JOB_STALE_AFTER", "900"))  # seconds
+ANALYSIS_JOB_SWEEP_INTERVAL = int(os.getenv("ANALYSIS_JOB_SWEEP_INTERVAL", "60"))  # seconds
+
+OPEN_JOB_STATUSES = ("queued", "running")
+
+# =====================================================
+# 📥 Enqueue
+# =====================================================
+def enqueue_analysis_job(only_changed=False):
+    """Record a queued analysis job and hand it to the background scheduler."""
+    from services.scheduler import scheduler
+
+    job = AnalysisJob(status="queued", only_changed=only_changed)
+    db.session.add(job)
+    db.session.commit()
+
+    if scheduler.running:
+        # No trigger means "run once, now" on the scheduler's thread pool
+        scheduler.add_job(func=run_analysis_job, args=[job.id], id=f"analysis_job_{job.id}")
+    else:
+        threading.Thread(target=run_analysis_job, args=(job.id,), daemon=True).start()
+
+    logger.info(f"📥 Queued analysis job #{job.id}")
+    return job
+
+# =====================================================
+# 🧹 Stale job recovery
+# =====================================================
+def job_is_stale(job, now=None):
+    """True for a queued/running job whose worker has shown no sign of life for ANALYSIS_JOB_STALE_AFTER."""
+    last_seen = job.heartbeat_at or job.created_at
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=ANALYSIS_JOB_STALE_AFTER)
+    return job.status in OPEN_JOB_STATUSES and last_seen is not None and last_seen < cutoff
+
+def fail_interrupted_jobs(job_ids=None):
+    """
+    Mark queued/running jobs without a heartbeat for ANALYSIS_JOB_STALE_AFTER
+    as failed. Their worker died with its process (a restart, a deploy, an
+    OOM kill), so they would otherwise show as running forever. Jobs that
+    are still making progress, e.g. in old dynos during a release, are
+    left alone. Returns the number of jobs failed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_STALE_AFTER)
+    query = (
+        update(AnalysisJob)
+        .where(AnalysisJob.status.in_(OPEN_JOB_STATUSES))
+        .where(func.coalesce(AnalysisJob.heartbeat_at, AnalysisJob.created_at) < cutoff)
+    )
+    if job_ids is not None:
+        query = query.where(AnalysisJob.id.in_(job_ids))
+    result = db.session.execute(query.values(
+        status="failed",
+        error=f"No progress for {ANALYSIS_JOB_STALE_AFTER}s; the worker was probably restarted",
+        finished_at=datetime.utcnow(),
+    ))
+    db.session.commit()
+    if result.rowcount:
+        logger.warning(f"⚠️ Marked {result.rowcount} interrupted analysis job(s) as failed.")
+    return result.rowcount
+
+def run_stale_job_sweeper():
+    """Scheduler entry point for fail_interrupted_jobs()."""
+    from start_app import app
+    with app.app_context():
+        try:
+            fail_interrupted_jobs()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Stale job sweep failed: {e}")
+
+# =====================================================
+# ⚙️ Worker
+# =====================================================
+def _update_job(job_id, worker, **values):
+    """
+    Write to a job only while it is running and owned by `worker`, and
+    renew its heartbeat. False once it was failed as stale (or otherwise
+    taken away), so a worker never overwrites that outcome.
+    """
+    result = db.session.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.status == "running", AnalysisJob.claimed_by == worker)
+        .values(heartbeat_at=datetime.utcnow(), **values)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def run_analysis_job(job_id):
+    """Run a queued analysis job chunk by chunk, recording progress as it goes."""
+    from start_app import app
+    worker = uuid.uuid4().hex
+    with app.app_context():
+        job = db.session.get(AnalysisJob, job_id)
+        if job is None or job.status != "queued":
+            return
+        only_changed = job.only_changed
+
+        # Claim the job: only one worker can move it from queued to running
+        client_ids = [row[0] for row in db.session.query(Client.id).order_by(Client.id)]
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+            .values(status="running", claimed_by=worker, started_at=now, heartbeat_at=now,
+                    total_clients=len(client_ids))
+        ).rowcount == 1
+        db.session.commit()
+        if not claimed:
+            return
+
+        processed = succeeded = 0
+        try:
+            for start in range(0, len(client_ids), JOB_CHUNK_SIZE):
+                chunk = client_ids[start:start + JOB_CHUNK_SIZE]
+                clients = Client.query.filter(Client.id.in_(chunk)).all()
+                results = analyze_clients(clients, only_changed=only_changed)
+
+                processed += len(chunk)
+                succeeded += len(results)
+                if not _update_job(job_id, worker, processed_clients=processed, succeeded_clients=succeeded):
+                    logger.warning(f"⚠️ Analysis job #{job_id} was failed as stale; stopping its worker.")
+                    return
+
+            if _update_job(job_id, worker, status="completed", finished_at=datetime.utcnow()):
+                logger.info(f"✅ Analysis job #{job_id} completed ({succeeded}/{len(client_ids)}).")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Analysis job #{job_id} failed: {e}")
+            _update_job(job_id, worker, status="failed", error=str(e), finished_at=datetime.utcnow())
@@ -0,0 +1,115 @@
+import os
+import uuid
+import time
+import socket
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+LEADER_LEASE_NAME = "scheduler"
+LEADER_LEASE_TTL = int(os.getenv("LEADER_LEASE_TTL", "60"))  # seconds a lease stays valid without renewal
+LEADER_HEARTBEAT = int(os.getenv("LEADER_HEARTBEAT", "15"))  # seconds between renewals / takeover attempts
+
+# Unique per process: gunicorn workers on one host share the hostname
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Monotonic deadline until which this process may act as leader
+_leader_until = 0.0
+
+# =====================================================
+# 👑 Lease-based leader election
+# =====================================================
+def try_acquire_lease(name=LEADER_LEASE_NAME, holder=HOLDER_ID, ttl=LEADER_LEASE_TTL):
+    """
+    Take or renew the lease `name`; True if `holder` owns it afterwards.
+
+    A single conditional UPDATE both renews our own lease and steals an
+    expired one, so two processes can never both succeed. The first ever
+    acquisition inserts the row; losing that race shows up as an
+    IntegrityError.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    try:
+        result = db.session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .where((SchedulerLease.holder == holder) | (SchedulerLease.expires_at < now))
+            .values(holder=holder, expires_at=expires_at, renewed_at=now)
+        )
+        if result.rowcount == 0:
+            if db.session.get(SchedulerLease, name) is not None:
+                db.session.rollback()
+                return False
+            db.session.add(SchedulerLease(name=name, holder=holder, expires_at=expires_at, renewed_at=now))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+def release_lease(name=LEADER_LEASE_NAME, holder=HOLDER_ID):
+    """Expire our lease now so another process can take over without waiting out the TTL."""
+    db.session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, SchedulerLease.holder == holder)
+        .values(expires_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+def heartbeat(app):
+    """Scheduler job run in every process: renew the lease, or take it over once it lapses."""
+    global _leader_until
+    was_leader = is_leader()
+    started = time.monotonic()
+    with app.app_context():
+        try:
+            acquired = try_acquire_lease()
+        except Exception as e:
+            logger.warning(f"⚠️ Leader lease heartbeat failed: {e}")
+            db.session.rollback()
+            acquired = False
+
+    # Measured from before the round trip, so we stop acting as leader no
+    # later than the lease row itself expires
+    _leader_until = started + LEADER_LEASE_TTL if acquired else 0.0
+    if acquired and not was_leader:
+        logger.info(f"👑 {HOLDER_ID} is now the scheduler leader.")
+    elif was_leader and not acquired:
+        logger.warning(f"⚠️ {HOLDER_ID} lost scheduler leadership.")
+    return acquired
+
+def is_leader():
+    return time.monotonic() < _leader_until
+
+def step_down(app):
+    """Release leadership on shutdown so failover is immediate."""
+    global _leader_until
+    if not is_leader():
+        return
+    _leader_until = 0.0
+    try:
+        with app.app_context():
+            release_lease()
+        logger.info(f"👋 {HOLDER_ID} released scheduler leadership.")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not release leader lease: {e}")
+
+def leader_only(func):
+    """Wrap a scheduled job so it runs only in the process holding the lease."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_leader():
+            logger.debug(f"⏭️ Skipping {func.__name__}: not the scheduler leader.")
+            return None
+        return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from services.sqlite_profile import apply_sqlite_profile
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # SQLite file; default instance/llm_cache.sqlite3
+
+llm_cache = None
+
+# =====================================================
+# 🗄️ Content-addressed response cache
+# =====================================================
+class LLMCache:
+    """
+    Persistent cache of model responses, keyed by a hash of the full request.
+
+    Entries expire after `ttl` seconds; once more than `max_entries` are
+    stored, the least recently used ones are evicted. Stored in its own
+    SQLite file so cache traffic never contends with the app database.
+    Several workers may share the file, so the entry count is always read
+    from the table rather than tracked in memory.
+    """
+
+    def __init__(self, path, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        apply_sqlite_profile(self._conn)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt, temperature, max_tokens, response_format=None):
+        """Hash every request parameter that can change the model's answer."""
+        params = [model, system_prompt, prompt, temperature, max_tokens]
+        if response_format is not None:  # appended only when set, so existing keys stay valid
+            params.append(response_format)
+        payload = json.dumps(
+            params,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss or expiry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, response):
+        """Store a response, evicting least recently used entries past the size limit."""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so the count and
+            # the eviction see the same table as the other workers' writes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                overflow = self._count() - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN "
+                        "(SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.evictions += overflow
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._count()
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+# =====================================================
+# ✅ Initialization
+# =====================================================
+def init_llm_cache(app):
+    """Open the response cache (LLM_CACHE_PATH, or a file in the app's instance folder)."""
+    global llm_cache
+    if not LLM_CACHE_ENABLED:
+        logger.info("ℹ️ LLM response cache disabled.")
+        return None
+    path = LLM_CACHE_PATH or os.path.join(app.instance_path, "llm_cache.sqlite3")
+    llm_cache = LLMCache(path)
+    logger.info(f"✅ LLM response cache ready ({llm_cache.stats()['entries']} entries).")
+    return llm_cache
+
+def get_llm_cache():
+    return llm_cache
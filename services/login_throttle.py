@@ -0,0 +1,87 @@
+import os
+import math
+import logging
+import threading
+from services.token_bucket import MemoryTokenBuckets, SQLiteTokenBuckets
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+# "memory" limits each worker separately; "sqlite" shares the buckets across
+# every worker on the host through a file in the instance folder
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory").lower()
+LOGIN_THROTTLE_DB_PATH = os.getenv("LOGIN_THROTTLE_DB_PATH")  # default instance/login_throttle.sqlite3
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "20"))
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "10"))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "5"))
+LOGIN_ACCOUNT_BURST = float(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+
+# Password hashes verified at once per process, and how long a login waits for a slot
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "2"))
+PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", "2"))
+
+login_buckets = MemoryTokenBuckets()
+hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_CONCURRENCY)
+
+stats = {"allowed": 0, "throttled_ip": 0, "throttled_account": 0, "busy": 0, "rehashed": 0}
+
+class LoginBusy(Exception):
+    """Every password-hash slot stayed taken for PASSWORD_HASH_WAIT seconds."""
+
+def init_login_throttle(app):
+    """Pick the bucket store; the SQLite one lives in the app's instance folder."""
+    global login_buckets
+    if LOGIN_THROTTLE_BACKEND == "sqlite":
+        os.makedirs(app.instance_path, exist_ok=True)
+        login_buckets = SQLiteTokenBuckets(
+            LOGIN_THROTTLE_DB_PATH or os.path.join(app.instance_path, "login_throttle.sqlite3")
+        )
+    else:
+        login_buckets = MemoryTokenBuckets()
+    logger.info(f"✅ Login throttling ready ({LOGIN_THROTTLE_BACKEND} buckets).")
+    return login_buckets
+
+# =====================================================
+# 🚦 Throttling
+# =====================================================
+def check_login_allowed(ip, email):
+    """
+    Spend one token from the client IP's bucket and one from the account's.
+
+    Returns 0 when the attempt may go ahead, otherwise the whole number of
+    seconds to wait. Called before any password hashing, so rejected
+    attempts cost no hash CPU.
+    """
+    wait = login_buckets.consume(f"ip:{ip}", LOGIN_IP_PER_MINUTE / 60, LOGIN_IP_BURST)
+    if wait:
+        stats["throttled_ip"] += 1
+        return math.ceil(wait)
+    wait = login_buckets.consume(f"account:{(email or '').lower()}", LOGIN_ACCOUNT_PER_MINUTE / 60, LOGIN_ACCOUNT_BURST)
+    if wait:
+        stats["throttled_account"] += 1
+        return math.ceil(wait)
+    stats["allowed"] += 1
+    return 0
+
+def verify_password(user, password):
+    """
+    Check a password with at most PASSWORD_HASH_CONCURRENCY hashes in flight.
+
+    A correct password stored under an older hash policy is re-hashed with
+    the current one; the caller commits. Raises LoginBusy when no slot frees
+    up in time.
+    """
+    if not hash_slots.acquire(timeout=PASSWORD_HASH_WAIT):
+        stats["busy"] += 1
+        raise LoginBusy()
+    try:
+        if not user.check_password(password):
+            return False
+        if user.password_needs_rehash():
+            user.set_password(password)
+            stats["rehashed"] += 1
+        return True
+    finally:
+        hash_slots.release()
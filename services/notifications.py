@@ -1,9 +1,10 @@
 import os
 import logging
-from ringcentral import SDK
-from msal import ConfidentialClientApplication
-import requests
 from dotenv import load_dotenv
+from services.http_client import get_session
+from services.ringcentral_session import get_ringcentral_session
+from services.graph_auth import get_graph_token_provider
+from services.rate_limit import RATE_LIMIT_MAX_THROTTLES, RateLimited, get_rate_limiter, parse_retry_after
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -25,20 +26,25 @@ OUTLOOK_REDIRECT_URI = os.getenv("OUTLOOK_REDIRECT_URI")
 OUTLOOK_AUTHORITY = "https://login.microsoftonline.com/common"
 OUTLOOK_SCOPES = ["https://graph.microsoft.com/.default"]
 
+# Overridable so the Graph calls can be pointed at a local stub server
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.microsoft.com/v1.0").rstrip("/")
+GRAPH_BATCH_LIMIT = 20  # Graph accepts at most 20 requests per $batch
+
+# Pooled keep-alive connections shared by every Graph call in the process
+graph_session = get_session("graph")
+
 # ============================
 # RINGCENTRAL FUNCTIONS
 # ============================
 def send_sms(phone_number, message_text):
     """Send an SMS using RingCentral API."""
     try:
-        sdk = SDK(RINGCENTRAL_CLIENT_ID, RINGCENTRAL_CLIENT_SECRET, RINGCENTRAL_SERVER_URL)
-        platform = sdk.platform()
-        platform.login(jwt=os.getenv("RINGCENTRAL_JWT"))  # You can generate a JWT for your app
-        response = platform.post('/restapi/v1.0/account/~/extension/~/sms', {
-            'from': {'phoneNumber': os.getenv("RINGCENTRAL_PHONE")},
-            'to': [{'phoneNumber': phone_number}],
-            'text': message_text
-        })
+        # Shared session: logs in once per process, not once per message
+        session = get_ringcentral_session(
+            RINGCENTRAL_CLIENT_ID, RINGCENTRAL_CLIENT_SECRET, RINGCENTRAL_SERVER_URL,
+            jwt=os.getenv("RINGCENTRAL_JWT"),  # You can generate a JWT for your app
+        )
+        response = session.send_sms(os.getenv("RINGCENTRAL_PHONE"), phone_number, message_text)
         logger.info(f"✅ SMS sent to {phone_number}")
         return response.json()
     except Exception as e:
@@ -49,18 +55,9 @@ def send_sms(phone_number, message_text):
 # OUTLOOK EMAIL FUNCTIONS
 # ============================
 def get_outlook_token():
-    """Authenticate and retrieve access token for Outlook Graph API."""
-    app = ConfidentialClientApplication(
-        OUTLOOK_CLIENT_ID,
-        authority=OUTLOOK_AUTHORITY,
-        client_credential=OUTLOOK_CLIENT_SECRET
-    )
-    result = app.acquire_token_for_client(scopes=OUTLOOK_SCOPES)
-    if "access_token" in result:
-        return result["access_token"]
-    else:
-        logger.error(f"❌ Outlook auth failed: {result.get('error_description')}")
-        return None
+    """Retrieve the shared, cached access token for Outlook Graph API."""
+    provider = get_graph_token_provider(OUTLOOK_CLIENT_ID, OUTLOOK_CLIENT_SECRET, OUTLOOK_AUTHORITY)
+    return provider.get_token()
 
 def send_outlook_email(recipient, subject, content):
     """Send an email using Outlook Graph API."""
@@ -68,11 +65,23 @@ def send_outlook_email(recipient, subject, content):
     if not token:
         return None
 
-    url = "https://graph.microsoft.com/v1.0/users/me/sendMail"
+    url = f"{GRAPH_API_BASE}/users/me/sendMail"
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
     }
+    body = build_mail_message(recipient, subject, content)
+    try:
+        response = graph_session.post(url, headers=headers, json=body)
+        response.raise_for_status()
+        logger.info(f"✅ Email sent to {recipient}")
+        return response.json()
+    except Exception as e:
+        logger.error(f"❌ Failed to send email: {e}")
+        return None
+
+def build_mail_message(recipient, subject, content, save_to_sent_items=None):
+    """Graph sendMail request body for a plain-text email."""
     body = {
         "message": {
             "subject": subject,
@@ -80,11 +89,134 @@ def send_outlook_email(recipient, subject, content):
             "toRecipients": [{"emailAddress": {"address": recipient}}]
         }
     }
+    if save_to_sent_items is not None:
+        body["saveToSentItems"] = "true" if save_to_sent_items else "false"
+    return body
+
+# ============================
+# OUTLOOK BATCH FUNCTIONS
+# ============================
+def send_outlook_emails_batch(emails, sender="me", token_provider=None, save_to_sent_items=None):
+    """
+    Send many emails through Graph JSON batching, 20 sendMail calls per request.
+
+    `emails` is an iterable of (key, recipient, subject, content) tuples.
+    Returns {key: {"ok": bool, "status": int, "error": str or None}} so each
+    result can be matched back to the client it was sent for.
+    """
+    provider = token_provider or get_graph_token_provider(
+        OUTLOOK_CLIENT_ID, OUTLOOK_CLIENT_SECRET, OUTLOOK_AUTHORITY
+    )
+    emails = list(emails)
+    if not emails:
+        return {}
+    results = {}
+
+    for start in range(0, len(emails), GRAPH_BATCH_LIMIT):
+        chunk = emails[start:start + GRAPH_BATCH_LIMIT]
+        results.update(_send_mail_batch(chunk, sender, provider, save_to_sent_items))
+
+    sent = sum(1 for r in results.values() if r["ok"])
+    logger.info(f"📧 Outlook batch: {sent}/{len(results)} emails accepted.")
+    return results
+
+def _send_mail_batch(chunk, sender, provider, save_to_sent_items):
+    """
+    Send one chunk (at most 20 emails) paced by the shared "graph_mail" rate limiter.
+
+    Emails Graph throttles (429, for the whole batch or single requests in
+    it) slow the limiter down and are sent again after Retry-After; only the
+    throttled ones are re-sent.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return _post_mail_batch(chunk, sender, provider, save_to_sent_items)
+
+    results = {}
+    pending = list(chunk)
+    for _ in range(RATE_LIMIT_MAX_THROTTLES + 1):
+        try:
+            limiter.acquire("graph_mail", cost=len(pending))
+        except RateLimited as e:
+            results.update({key: {"ok": False, "status": 429, "error": str(e)} for key, *_ in pending})
+            return results
+        results.update(_post_mail_batch(pending, sender, provider, save_to_sent_items))
+
+        throttled = [email for email in pending if results[email[0]]["status"] == 429]
+        if any(results[key]["ok"] for key, *_ in pending):
+            limiter.succeeded("graph_mail")
+        if not throttled:
+            break
+        limiter.throttled("graph_mail", max(
+            (results[key].get("retry_after") for key, *_ in throttled),
+            key=lambda value: parse_retry_after(value),
+        ))
+        pending = throttled
+    return results
+
+def _post_mail_batch(chunk, sender, provider, save_to_sent_items):
+    """POST one $batch request (at most 20 emails) and map each response to its key."""
+    token = provider.get_token()
+    if not token:
+        return {key: {"ok": False, "status": 0, "error": "No Outlook access token"} for key, *_ in chunk}
+
     try:
-        response = requests.post(url, headers=headers, json=body)
-        response.raise_for_status()
-        logger.info(f"✅ Email sent to {recipient}")
-        return response.json()
+        response = graph_session.post(
+            f"{GRAPH_API_BASE}/$batch",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            json=build_mail_batch(chunk, sender, save_to_sent_items),
+        )
+        if response.status_code == 401:
+            provider.invalidate()
+        payload = response.json() if response.status_code == 200 else None
     except Exception as e:
-        logger.error(f"❌ Failed to send email: {e}")
-        return None
+        logger.error(f"❌ Outlook batch request failed: {e}")
+        return {key: {"ok": False, "status": 0, "error": str(e)} for key, *_ in chunk}
+    return read_mail_batch_response(chunk, response.status_code, response.headers, payload)
+
+def build_mail_batch(chunk, sender, save_to_sent_items=None):
+    """Graph $batch body with one sendMail request per (key, recipient, subject, content) email."""
+    # Batch request ids are positions in the chunk; keys may not be strings
+    return {"requests": [
+        {
+            "id": str(index),
+            "method": "POST",
+            "url": f"/users/{sender}/sendMail",
+            "headers": {"Content-Type": "application/json"},
+            "body": build_mail_message(recipient, subject, content, save_to_sent_items),
+        }
+        for index, (_key, recipient, subject, content) in enumerate(chunk)
+    ]}
+
+def read_mail_batch_response(chunk, status_code, headers, payload):
+    """
+    Map a $batch HTTP response back to {key: {"ok", "status", "error"}}.
+
+    Throttled emails (the whole batch or single requests) also carry the
+    "retry_after" header value so the caller can pause and re-send them.
+    """
+    if status_code == 429:
+        return {key: {"ok": False, "status": 429, "error": "Throttled by Graph", "retry_after": headers.get("Retry-After")}
+                for key, *_ in chunk}
+    if status_code != 200:
+        logger.error(f"❌ Outlook batch request failed: HTTP {status_code}")
+        return {key: {"ok": False, "status": status_code, "error": f"HTTP {status_code}"} for key, *_ in chunk}
+
+    responses = {item["id"]: item for item in (payload or {}).get("responses", [])}
+    results = {}
+    for index, (key, recipient, _subject, _content) in enumerate(chunk):
+        item = responses.get(str(index))
+        if item is None:
+            results[key] = {"ok": False, "status": 0, "error": "Missing from batch response"}
+            continue
+        status = item.get("status", 0)
+        ok = 200 <= status < 300
+        error = None if ok else ((item.get("body") or {}).get("error") or {}).get("message", f"HTTP {status}")
+        if status == 429:
+            results[key] = {"ok": False, "status": 429, "error": error,
+                            "retry_after": (item.get("headers") or {}).get("Retry-After")}
+            continue
+        if not ok:
+            logger.error(f"❌ Failed to send email to {recipient}: {error}")
+        results[key] = {"ok": ok, "status": status, "error": error}
+    return results
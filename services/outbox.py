@@ -0,0 +1,234 @@
+import os
+import uuid
+import asyncio
+import random
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import select, update, and_, or_
+from extensions import db
+from models import NotificationOutbox
+from services.notifications import GRAPH_BATCH_LIMIT, send_outlook_emails_batch
+from services.async_engine import NOTIFY_ENGINE, asend_outbox_messages
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))  # rows claimed per round
+OUTBOX_MAX_BATCHES = int(os.getenv("OUTBOX_MAX_BATCHES", "50"))  # rounds per dispatch run
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = int(os.getenv("OUTBOX_BACKOFF_BASE", "30"))  # seconds before the first retry, doubled after each
+OUTBOX_BACKOFF_MAX = int(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv("OUTBOX_CLAIM_TIMEOUT", "300"))  # a crashed dispatcher's rows are reclaimed after this
+OUTBOX_CLAIM_RENEW_INTERVAL = OUTBOX_CLAIM_TIMEOUT / 3  # a live dispatcher extends its claim this often
+OUTBOX_SMS_CONCURRENCY = int(os.getenv("OUTBOX_SMS_CONCURRENCY", "4"))
+OUTBOX_EMAIL_CONCURRENCY = int(os.getenv("OUTBOX_EMAIL_CONCURRENCY", "4"))  # each worker sends one Graph $batch
+OUTBOX_DISPATCH_INTERVAL = int(os.getenv("OUTBOX_DISPATCH_INTERVAL", "30"))
+
+# One bounded pool per channel, so a slow provider only backs up its own queue
+_pools = {
+    "sms": ThreadPoolExecutor(max_workers=OUTBOX_SMS_CONCURRENCY, thread_name_prefix="outbox-sms"),
+    "email": ThreadPoolExecutor(max_workers=OUTBOX_EMAIL_CONCURRENCY, thread_name_prefix="outbox-email"),
+    "async": ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-async"),  # NOTIFY_ENGINE=async loop
+}
+
+# =====================================================
+# 📥 Enqueue
+# =====================================================
+def enqueue_notification(channel, recipient, body, subject=None, client_id=None):
+    """Add an outbox row to the current session; it is committed with the caller's transaction."""
+    row = NotificationOutbox(channel=channel, recipient=recipient, body=body, subject=subject, client_id=client_id)
+    db.session.add(row)
+    return row
+
+def enqueue_client_notifications(client, _summary):
+    """Queue the SMS and email sent when a client gets a new AI analysis."""
+    text = f"New AI analysis update for {client.name}."
+    if client.phone:
+        enqueue_notification("sms", client.phone, text, client_id=client.id)
+    if client.email:
+        enqueue_notification("email", client.email, text, subject="CasePulse AI Update", client_id=client.id)
+
+# =====================================================
+# 🔒 Claiming
+# =====================================================
+def _claimable(now):
+    return or_(
+        and_(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now),
+        # Rows left "sending" by a dispatcher that died mid-batch
+        and_(NotificationOutbox.status == "sending", NotificationOutbox.claimed_until < now),
+    )
+
+def claim_batch(limit=OUTBOX_BATCH_SIZE):
+    """
+    Mark up to `limit` due rows as sending under a fresh claim token and return them.
+
+    The UPDATE re-checks the claimable condition, so rows grabbed by a
+    concurrent dispatcher in the meantime are simply not returned.
+    """
+    now = datetime.utcnow()
+    ids = db.session.scalars(
+        select(NotificationOutbox.id)
+        .where(_claimable(now))
+        .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+        .limit(limit)
+    ).all()
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    db.session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids), _claimable(now))
+        .values(status="sending", claimed_by=token, claimed_until=now + timedelta(seconds=OUTBOX_CLAIM_TIMEOUT))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return db.session.scalars(
+        select(NotificationOutbox).where(NotificationOutbox.claimed_by == token)
+    ).all()
+
+def renew_claim(token):
+    """Push back the expiry of a claim that is still being worked on; returns the rows still held."""
+    result = db.session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.claimed_by == token, NotificationOutbox.status == "sending")
+        .values(claimed_until=datetime.utcnow() + timedelta(seconds=OUTBOX_CLAIM_TIMEOUT))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+# =====================================================
+# 📤 Channel senders (run on the pool threads, no DB access)
+# =====================================================
+def _send_sms(message):
+    """Send one SMS; returns {id: error or None}."""
+    from services.scheduler import RINGCENTRAL_USERNAME, get_admin_sms_session
+    try:
+        get_admin_sms_session().send_sms(RINGCENTRAL_USERNAME, message["recipient"], message["body"])
+        return {message["id"]: None}
+    except Exception as e:
+        return {message["id"]: str(e) or e.__class__.__name__}
+
+def _send_email_chunk(messages):
+    """Send up to GRAPH_BATCH_LIMIT emails in one Graph $batch; returns {id: error or None}."""
+    from services.scheduler import OUTLOOK_ADMIN_EMAIL, get_admin_token_provider
+    try:
+        results = send_outlook_emails_batch(
+            [(m["id"], m["recipient"], m["subject"], m["body"]) for m in messages],
+            sender=OUTLOOK_ADMIN_EMAIL,
+            token_provider=get_admin_token_provider(),
+            save_to_sent_items=True,
+        )
+    except Exception as e:
+        return {m["id"]: str(e) or e.__class__.__name__ for m in messages}
+    return {m["id"]: None if results[m["id"]]["ok"] else results[m["id"]]["error"] for m in messages}
+
+# =====================================================
+# 🚚 Dispatcher
+# =====================================================
+def backoff_delay(attempts):
+    """Exponential backoff with ±10% jitter, capped at OUTBOX_BACKOFF_MAX."""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.9, 1.1)
+
+def dispatch_batch(rows):
+    """
+    Send claimed rows through the channel pools and record each outcome.
+
+    Sends can block on the provider rate limits for minutes, so the claim is
+    renewed every OUTBOX_CLAIM_RENEW_INTERVAL seconds until the round is
+    done; only a dispatcher that died stops renewing and has its rows
+    reclaimed. Outcomes are written only while this round's claim token
+    still owns the row.
+    """
+    token = rows[0].claimed_by  # claim_batch gives every row of a round the same token
+    # Plain dicts go to the worker threads; ORM objects stay on this thread
+    messages = [
+        {"id": r.id, "channel": r.channel, "recipient": r.recipient, "subject": r.subject, "body": r.body}
+        for r in rows
+    ]
+    attempts = {r.id: r.attempts + 1 for r in rows}
+    channels = {r.id: r.channel for r in rows}
+
+    if NOTIFY_ENGINE == "async":
+        # Every send in the batch in flight at once on one loop, bounded by semaphores
+        futures = [_pools["async"].submit(asyncio.run, asend_outbox_messages(messages))]
+    else:
+        futures = [_pools["sms"].submit(_send_sms, m) for m in messages if m["channel"] == "sms"]
+        emails = [m for m in messages if m["channel"] == "email"]
+        futures += [
+            _pools["email"].submit(_send_email_chunk, emails[start:start + GRAPH_BATCH_LIMIT])
+            for start in range(0, len(emails), GRAPH_BATCH_LIMIT)
+        ]
+
+    outcomes = {}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=OUTBOX_CLAIM_RENEW_INTERVAL)
+        for future in done:
+            outcomes.update(future.result())
+        if pending:
+            renew_claim(token)
+
+    now = datetime.utcnow()
+    counts = {"sent": 0, "failed": 0, "pending": 0}
+    lost = []
+    for row_id, attempt in attempts.items():
+        error = outcomes.get(row_id, f"Unknown channel {channels[row_id]!r}")
+        values = {"attempts": attempt, "claimed_by": None, "claimed_until": None}
+        if error is None:
+            values.update(status="sent", sent_at=now, last_error=None)
+        elif attempt >= OUTBOX_MAX_ATTEMPTS:
+            values.update(status="failed", last_error=error)
+        else:
+            values.update(status="pending", last_error=error,
+                          next_attempt_at=now + timedelta(seconds=backoff_delay(attempt)))
+        result = db.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row_id, NotificationOutbox.claimed_by == token)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            counts[values["status"]] += 1
+        else:
+            lost.append(row_id)
+    db.session.commit()
+
+    if lost:
+        logger.warning(
+            f"⚠️ Outbox claim {token[:8]} lost {len(lost)} row(s) to another dispatcher; "
+            f"their outcome here was not recorded: {lost}"
+        )
+    return counts["sent"], counts["failed"], counts["pending"]
+
+def dispatch_outbox(max_batches=OUTBOX_MAX_BATCHES):
+    """Drain due outbox rows batch by batch. Must run inside an app context."""
+    totals = {"sent": 0, "failed": 0, "retrying": 0}
+    for _ in range(max_batches):
+        rows = claim_batch()
+        if not rows:
+            break
+        sent, failed, retrying = dispatch_batch(rows)
+        totals["sent"] += sent
+        totals["failed"] += failed
+        totals["retrying"] += retrying
+    if any(totals.values()):
+        logger.info(
+            f"📬 Outbox: {totals['sent']} sent, {totals['retrying']} to retry, {totals['failed']} gave up."
+        )
+    return totals
+
+def run_outbox_dispatcher():
+    """Scheduler entry point for dispatch_outbox()."""
+    from start_app import app
+    with app.app_context():
+        try:
+            dispatch_outbox()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Outbox dispatch failed: {e}")
@@ -0,0 +1,189 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from services.sqlite_profile import apply_sqlite_profile
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 Configuration
+# =====================================================
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "300"))  # longest a send blocks for a token
+RATE_LIMIT_MAX_THROTTLES = int(os.getenv("RATE_LIMIT_MAX_THROTTLES", "3"))  # 429s absorbed per send before giving up
+RATE_LIMIT_DEFAULT_RETRY_AFTER = float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", "30"))
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH")  # SQLite file; default instance/rate_limits.sqlite3
+RATE_LIMIT_POLL = 5.0  # longest sleep between checks while waiting for tokens
+
+# provider -> (ceiling per minute, burst). The ceilings are the documented
+# limits: RingCentral's SMS API group and Exchange Online's per-mailbox
+# sendMail limit (each request inside a Graph $batch counts separately).
+PROVIDER_LIMITS = {
+    "ringcentral_sms": (float(os.getenv("RATE_LIMIT_SMS_PER_MINUTE", "40")), 10),
+    "graph_mail": (float(os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", "30")), 20),
+}
+
+# AIMD: halve the rate on every 429, win back this share of the ceiling per accepted request
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_SHARE = 0.02
+RATE_FLOOR_SHARE = 0.05
+
+rate_limiter = None
+
+class RateLimited(Exception):
+    """No token became available within RATE_LIMIT_MAX_WAIT, or the provider kept answering 429."""
+
+def parse_retry_after(value, default=RATE_LIMIT_DEFAULT_RETRY_AFTER):
+    """Seconds from a Retry-After header, which is either a number or an HTTP date."""
+    if value in (None, ""):
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+# =====================================================
+# 🚦 Adaptive, cross-process rate limiter
+# =====================================================
+class ProviderRateLimiter:
+    """
+    One token bucket per provider, kept in a SQLite file so every thread and
+    process on the host draws from the same budget.
+
+    Each bucket's refill rate starts at the provider's ceiling and adapts
+    (AIMD): a 429 halves it and blocks the bucket for Retry-After seconds,
+    and every success nudges it back up. Bulk runs settle just under the
+    rate the provider actually sustains instead of bursting into 429s.
+    """
+
+    def __init__(self, path, limits=None):
+        self.path = path
+        self.limits = limits or PROVIDER_LIMITS
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        apply_sqlite_profile(self._conn)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " provider TEXT PRIMARY KEY,"
+            " rate REAL NOT NULL,"  # tokens per second
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " blocked_until REAL NOT NULL DEFAULT 0,"
+            " throttled INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def _bounds(self, provider):
+        per_minute, burst = self.limits[provider]
+        ceiling = per_minute / 60
+        return ceiling, ceiling * RATE_FLOOR_SHARE, burst
+
+    def _update(self, provider, change):
+        """Run `change(rate, tokens, now, blocked_until)` inside one write transaction."""
+        ceiling, _floor, burst = self._bounds(provider)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT rate, tokens, updated_at, blocked_until FROM rate_limits WHERE provider = ?",
+                    (provider,),
+                ).fetchone()
+                rate, tokens, updated_at, blocked_until = row or (ceiling, burst, now, 0.0)
+                tokens = min(burst, tokens + max(0.0, now - max(updated_at, blocked_until)) * rate)
+                rate, tokens, blocked_until, result, throttled = change(rate, tokens, now, blocked_until)
+                self._conn.execute(
+                    "INSERT INTO rate_limits (provider, rate, tokens, updated_at, blocked_until, throttled)"
+                    " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(provider) DO UPDATE SET"
+                    " rate = excluded.rate, tokens = excluded.tokens, updated_at = excluded.updated_at,"
+                    " blocked_until = excluded.blocked_until, throttled = throttled + excluded.throttled",
+                    (provider, rate, tokens, max(now, updated_at), blocked_until, throttled),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def try_acquire(self, provider, cost=1):
+        """Take `cost` tokens if available: returns 0 on success, else the seconds to wait before retrying."""
+        _ceiling, _floor, burst = self._bounds(provider)
+        cost = min(cost, burst)  # a request bigger than the bucket waits for a full one
+
+        def take(rate, tokens, now, blocked_until):
+            if now < blocked_until:
+                return rate, tokens, blocked_until, blocked_until - now, 0
+            if tokens >= cost:
+                return rate, tokens - cost, blocked_until, 0.0, 0
+            return rate, tokens, blocked_until, (cost - tokens) / rate, 0
+
+        return self._update(provider, take)
+
+    def acquire(self, provider, cost=1, max_wait=RATE_LIMIT_MAX_WAIT):
+        """Block until `cost` tokens are taken from the provider's bucket; raises RateLimited on timeout."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire(provider, cost)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimited(f"{provider}: no capacity within {max_wait:.0f}s")
+            time.sleep(min(wait, RATE_LIMIT_POLL))  # re-check: other processes may change the rate
+
+    def succeeded(self, provider):
+        """Additive increase after an accepted request (a whole $batch counts once)."""
+        ceiling, _floor, _burst = self._bounds(provider)
+
+        def grow(rate, tokens, _now, blocked_until):
+            return min(ceiling, rate + ceiling * RATE_INCREASE_SHARE), tokens, blocked_until, None, 0
+
+        self._update(provider, grow)
+
+    def throttled(self, provider, retry_after=None):
+        """Multiplicative decrease on a 429, and no sends at all until Retry-After has passed."""
+        _ceiling, floor, _burst = self._bounds(provider)
+        delay = parse_retry_after(retry_after)
+
+        def shrink(rate, _tokens, now, blocked_until):
+            rate = max(floor, rate * RATE_DECREASE_FACTOR)
+            return rate, 0.0, max(blocked_until, now + delay), rate, 1
+
+        rate = self._update(provider, shrink)
+        logger.warning(f"🚦 {provider} throttled: pausing {delay:.0f}s, rate now {rate * 60:.1f}/min.")
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT provider, rate, tokens, blocked_until, throttled FROM rate_limits"
+            ).fetchall()
+        now = time.time()
+        return {
+            provider: {
+                "rate_per_minute": round(rate * 60, 2),
+                "ceiling_per_minute": self.limits[provider][0] if provider in self.limits else None,
+                "tokens": round(tokens, 2),
+                "blocked_for_seconds": round(max(0.0, blocked_until - now), 1),
+                "throttled": throttled,
+            }
+            for provider, rate, tokens, blocked_until, throttled in rows
+        }
+
+def init_rate_limiter(app):
+    """Open the shared limiter state (RATE_LIMIT_DB_PATH, or a file in the app's instance folder)."""
+    global rate_limiter
+    if not RATE_LIMIT_ENABLED:
+        logger.info("ℹ️ Provider rate limiting disabled.")
+        return None
+    os.makedirs(app.instance_path, exist_ok=True)
+    rate_limiter = ProviderRateLimiter(RATE_LIMIT_DB_PATH or os.path.join(app.instance_path, "rate_limits.sqlite3"))
+    logger.info("✅ Provider rate limiter ready.")
+    return rate_limiter
+
+def get_rate_limiter():
+    return rate_limiter
@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+import threading
+from ringcentral import SDK
+from ringcentral.http.client import Client
+from ringcentral.http.api_response import ApiResponse
+from ringcentral.http.api_exception import ApiException
+from services.http_client import get_session
+from services.rate_limit import RATE_LIMIT_MAX_THROTTLES, RateLimited, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Refresh the access token this many seconds before RingCentral expires it
+RINGCENTRAL_REFRESH_MARGIN = int(os.getenv("RINGCENTRAL_REFRESH_MARGIN", "120"))
+
+SMS_ENDPOINT = "/restapi/v1.0/account/~/extension/~/sms"
+
+# =====================================================
+# 🌐 Pooled HTTP transport
+# =====================================================
+class PooledClient(Client):
+    """SDK HTTP client that sends over the shared keep-alive session instead of a new one per call."""
+
+    def load_response(self, request):
+        session = get_session("ringcentral")
+        return ApiResponse(request, session.send(request, timeout=session.timeout))
+
+# =====================================================
+# 🔐 Shared RingCentral session
+# =====================================================
+class RingCentralSession:
+    """
+    One logged-in RingCentral platform shared by every thread in the process.
+
+    The first caller logs in; later callers reuse the same access token, which
+    is refreshed shortly before it expires. Login and refresh are serialized by
+    a lock so a burst of sends triggers a single OAuth round trip.
+    """
+
+    def __init__(self, client_id, client_secret, server_url, **login_kwargs):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.server_url = server_url
+        self.login_kwargs = login_kwargs
+        self.logins = 0
+        self.refreshes = 0
+        self._sdk = None
+        self._lock = threading.Lock()
+
+    def platform(self):
+        """Return a platform whose access token is valid for at least the refresh margin."""
+        with self._lock:
+            if self._sdk is None:
+                self._sdk = SDK(self.client_id, self.client_secret, self.server_url)
+                # The SDK has no transport hook; swap in the pooled client it delegates to
+                self._sdk.platform()._client = PooledClient()
+            platform = self._sdk.platform()
+            auth = platform.auth()
+
+            if auth.data().get("expire_time", 0) - RINGCENTRAL_REFRESH_MARGIN > time.time():
+                return platform
+
+            if auth.refresh_token_valid():
+                try:
+                    platform.refresh()
+                    self.refreshes += 1
+                    return platform
+                except Exception as e:
+                    logger.warning(f"⚠️ RingCentral token refresh failed, logging in again: {e}")
+
+            platform.login(**self.login_kwargs)
+            self.logins += 1
+            logger.info("🔐 RingCentral session established.")
+            return platform
+
+    def reset(self):
+        """Drop the cached tokens so the next call logs in from scratch."""
+        with self._lock:
+            if self._sdk is not None:
+                self._sdk.platform().auth().reset()
+
+    def post(self, url, body):
+        """POST through the shared session, logging in again once if the token was revoked."""
+        try:
+            return self.platform().post(url, body)
+        except ApiException as e:
+            response = e.api_response().response() if e.api_response() else None
+            if response is None or response.status_code != 401:
+                raise
+            logger.warning("⚠️ RingCentral rejected the access token, re-authenticating.")
+            self.reset()
+            return self.platform().post(url, body)
+
+    def send_sms(self, from_number, to_number, text):
+        """
+        Send one SMS, pacing it through the shared "ringcentral_sms" rate limiter.
+
+        A 429 slows the limiter down and the SMS is sent again once
+        Retry-After has passed, instead of surfacing as a failure.
+        """
+        body = {
+            "from": {"phoneNumber": from_number},
+            "to": [{"phoneNumber": to_number}],
+            "text": text,
+        }
+        limiter = get_rate_limiter()
+        if limiter is None:
+            return self.post(SMS_ENDPOINT, body)
+
+        for _ in range(RATE_LIMIT_MAX_THROTTLES + 1):
+            limiter.acquire("ringcentral_sms")
+            try:
+                response = self.post(SMS_ENDPOINT, body)
+            except ApiException as e:
+                response = e.api_response().response() if e.api_response() else None
+                if response is None or response.status_code != 429:
+                    raise
+                limiter.throttled("ringcentral_sms", response.headers.get("Retry-After"))
+                continue
+            limiter.succeeded("ringcentral_sms")
+            return response
+        raise RateLimited(f"RingCentral kept rate limiting the SMS to {to_number}")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_ringcentral_session(client_id, client_secret, server_url, **login_kwargs):
+    """Return the process-wide session for this set of credentials, creating it once."""
+    key = (client_id, server_url, tuple(sorted(login_kwargs.items())))
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = RingCentralSession(client_id, client_secret, server_url, **login_kwargs)
+            _sessions[key] = session
+        return session
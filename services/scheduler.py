@@ -1,14 +1,16 @@
 import os
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
-from flask import current_app
-from extensions import db
-from models import Client
-from services.ai_agent import analyze_client_cases
+from services.ai_agent import analyze_all_client_cases
 
-from ringcentral import SDK
-from msal import ConfidentialClientApplication
-import requests
+from services.ringcentral_session import get_ringcentral_session
+from services.graph_auth import get_graph_token_provider
+from services.notifications import GRAPH_API_BASE, graph_session
+from services.outbox import OUTBOX_DISPATCH_INTERVAL, dispatch_outbox, enqueue_client_notifications, run_outbox_dispatcher
+from services.jobs import ANALYSIS_JOB_SWEEP_INTERVAL, run_stale_job_sweeper
+from services.ai_batch import (
+    AI_BATCH_POLL_INTERVAL, AI_NIGHTLY_BATCH, AI_NIGHTLY_BATCH_HOUR, run_batch_poller, run_nightly_batch,
+)
 
 logger = logging.getLogger(__name__)
 scheduler = BackgroundScheduler()
@@ -29,20 +31,19 @@ OUTLOOK_TENANT_ID = os.getenv("OUTLOOK_TENANT_ID")
 OUTLOOK_ADMIN_EMAIL = os.getenv("OUTLOOK_ADMIN_EMAIL")
 
 # =====================================================
-# 📱 Initialize RingCentral SDK
+# 📱 RingCentral SMS (shared, process-wide session)
 # =====================================================
+def get_admin_sms_session():
+    """The shared RingCentral session for the firm's admin account."""
+    return get_ringcentral_session(
+        RINGCENTRAL_CLIENT_ID, RINGCENTRAL_CLIENT_SECRET, RINGCENTRAL_SERVER_URL,
+        username=RINGCENTRAL_USERNAME, extension=RINGCENTRAL_EXTENSION, password=RINGCENTRAL_PASSWORD,
+    )
+
 def send_ringcentral_sms(to_number, message):
     """Send SMS using RingCentral admin account."""
     try:
-        sdk = SDK(RINGCENTRAL_CLIENT_ID, RINGCENTRAL_CLIENT_SECRET, RINGCENTRAL_SERVER_URL)
-        platform = sdk.platform()
-        platform.login(RINGCENTRAL_USERNAME, RINGCENTRAL_EXTENSION, RINGCENTRAL_PASSWORD)
-
-        platform.post('/restapi/v1.0/account/~/extension/~/sms', {
-            'from': {'phoneNumber': RINGCENTRAL_USERNAME},
-            'to': [{'phoneNumber': to_number}],
-            'text': message
-        })
+        get_admin_sms_session().send_sms(RINGCENTRAL_USERNAME, to_number, message)
         logger.info(f"📲 SMS sent to {to_number}: {message}")
     except Exception as e:
         logger.error(f"❌ Failed to send RingCentral SMS: {e}")
@@ -50,18 +51,22 @@ def send_ringcentral_sms(to_number, message):
 # =====================================================
 # 📧 Outlook Email Notification
 # =====================================================
+def get_admin_token_provider():
+    """Graph token provider for the firm's tenant-scoped admin app."""
+    return get_graph_token_provider(
+        OUTLOOK_CLIENT_ID,
+        OUTLOOK_CLIENT_SECRET,
+        f"https://login.microsoftonline.com/{OUTLOOK_TENANT_ID}",
+    )
+
 def send_outlook_email(recipient_email, subject, body):
     """Send an email via Microsoft Graph API using the admin account."""
     try:
-        app = ConfidentialClientApplication(
-            OUTLOOK_CLIENT_ID,
-            authority=f"https://login.microsoftonline.com/{OUTLOOK_TENANT_ID}",
-            client_credential=OUTLOOK_CLIENT_SECRET
-        )
-        result = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
-
-        if "access_token" in result:
-            endpoint = f"https://graph.microsoft.com/v1.0/users/{OUTLOOK_ADMIN_EMAIL}/sendMail"
+        provider = get_admin_token_provider()
+        token = provider.get_token()
+
+        if token:
+            endpoint = f"{GRAPH_API_BASE}/users/{OUTLOOK_ADMIN_EMAIL}/sendMail"
             email_msg = {
                 "message": {
                     "subject": subject,
@@ -70,11 +75,14 @@ def send_outlook_email(recipient_email, subject, body):
                 },
                 "saveToSentItems": "true"
             }
-            headers = {"Authorization": f"Bearer {result['access_token']}"}
-            response = requests.post(endpoint, headers=headers, json=email_msg)
+            headers = {"Authorization": f"Bearer {token}"}
+            response = graph_session.post(endpoint, headers=headers, json=email_msg)
 
             if response.status_code in [200, 202]:
                 logger.info(f"📧 Email sent to {recipient_email}")
+            elif response.status_code == 401:
+                provider.invalidate()
+                logger.error(f"❌ Outlook email rejected, token dropped: {response.text}")
             else:
                 logger.error(f"❌ Outlook email failed: {response.text}")
         else:
@@ -86,56 +94,97 @@ def send_outlook_email(recipient_email, subject, body):
 # 🤖 Scheduler AI Analysis + Notification
 # =====================================================
 def check_all_clients():
-    """Background job that analyzes all client cases and sends notifications."""
+    """Background job that analyzes changed client cases and sends notifications."""
     from start_app import app
     with app.app_context():
         logger.info("🕒 Running scheduled CasePulse AI client analysis job...")
 
         try:
-            clients = Client.query.all()
-            logger.info(f"✅ Found {len(clients)} clients to analyze.")
-            if not clients:
+            # Only clients with new activity since their last analysis are processed.
+            # Their SMS/email rows are queued in the same commit as the analysis,
+            # so a crash can't lose a notification for a stored result.
+            results = analyze_all_client_cases(on_result=enqueue_client_notifications)
+            logger.info(f"✅ {len(results)} client(s) had new analysis results.")
+            if not results:
                 return
 
-            analyze_client_cases(clients)
-
-            for client in clients:
-                ai_summary = f"New AI analysis update for {client.name}."
-                if client.phone:
-                    send_ringcentral_sms(client.phone, ai_summary)
-                if client.email:
-                    send_outlook_email(client.email, "CasePulse AI Update", ai_summary)
+            # Send right away; anything that fails is retried by the outbox job
+            dispatch_outbox()
 
             logger.info("✅ CasePulse AI auto-analysis & notifications completed successfully.")
         except Exception as e:
             logger.error(f"❌ Error in scheduled job: {e}")
 
-# =====================================================
-# Schedule Job Every 10 Minutes
-# =====================================================
-scheduler.add_job(func=check_all_clients, trigger="interval", minutes=10)
 # ======================================================
 # ✅ Scheduler Initialization Function
 # ======================================================
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from datetime import timedelta
-from services.ai_agent import analyze_all_client_cases
+from apscheduler.triggers.cron import CronTrigger
+from datetime import datetime
+import atexit
 import logging
+from services.leader import LEADER_HEARTBEAT, heartbeat, leader_only, step_down
 
 logger = logging.getLogger(__name__)
 scheduler = BackgroundScheduler()
 
 def init_scheduler(app):
-    """Initialize the APScheduler with Flask app context."""
+    """
+    Initialize the APScheduler with Flask app context.
+
+    Every process runs the scheduler, but only the one holding the leader
+    lease (see services/leader.py) runs check_all_clients; the others just
+    heartbeat, ready to take over if the leader stops renewing.
+    """
     if not scheduler.running:
         with app.app_context():
             scheduler.add_job(
-                func=analyze_all_client_cases,
+                func=heartbeat,
+                args=[app],
+                trigger=IntervalTrigger(seconds=LEADER_HEARTBEAT),
+                id="leader_heartbeat",
+                name="Renew or take over the scheduler lease",
+                next_run_time=datetime.now(),  # elect a leader right away
+                replace_existing=True,
+            )
+            scheduler.add_job(
+                func=leader_only(check_all_clients),
                 trigger=IntervalTrigger(minutes=15),  # runs every 15 minutes
                 id="check_all_clients",
                 name="Analyze and notify clients",
                 replace_existing=True,
             )
+            scheduler.add_job(
+                func=leader_only(run_outbox_dispatcher),
+                trigger=IntervalTrigger(seconds=OUTBOX_DISPATCH_INTERVAL),
+                id="notification_outbox",
+                name="Send and retry queued notifications",
+                replace_existing=True,
+            )
+            scheduler.add_job(
+                func=leader_only(run_stale_job_sweeper),
+                trigger=IntervalTrigger(seconds=ANALYSIS_JOB_SWEEP_INTERVAL),
+                id="stale_analysis_jobs",
+                name="Fail analysis jobs whose worker died",
+                replace_existing=True,
+            )
+            if AI_NIGHTLY_BATCH:
+                scheduler.add_job(
+                    func=leader_only(run_nightly_batch),
+                    trigger=CronTrigger(hour=AI_NIGHTLY_BATCH_HOUR),
+                    id="nightly_analysis_batch",
+                    name="Submit the nightly Batch API analysis",
+                    replace_existing=True,
+                )
+            # Always on, so batches submitted before a restart or flag change still get collected
+            scheduler.add_job(
+                func=leader_only(run_batch_poller),
+                trigger=IntervalTrigger(seconds=AI_BATCH_POLL_INTERVAL),
+                id="analysis_batch_poller",
+                name="Collect finished Batch API analyses",
+                replace_existing=True,
+            )
             scheduler.start()
+            atexit.register(step_down, app)
             logger.info("✅ Scheduler started successfully.")
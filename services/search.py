@@ -0,0 +1,187 @@
+import re
+import logging
+from sqlalchemy import bindparam
+from extensions import db
+from models import Client, CaseUpdate, Message
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# source table -> (FTS5 table, indexed text column, result type)
+FTS_INDEXES = {
+    "case_updates": ("case_updates_fts", "summary", "case_update"),
+    "messages": ("messages_fts", "message", "message"),
+}
+
+# Shadow tables SQLite creates next to every FTS5 table
+FTS_SHADOW_SUFFIXES = ("", "_data", "_idx", "_docsize", "_config", "_content")
+
+def is_search_index_table(name):
+    """True for the FTS5 tables (and their shadow tables) that init_search_index() manages."""
+    return any(name == fts + suffix for fts, _column, _type in FTS_INDEXES.values() for suffix in FTS_SHADOW_SUFFIXES)
+
+# None until known: set by init_search_index() at bootstrap, or detected on first search
+fts_enabled = None
+
+# =====================================================
+# 🗂️ Index setup
+# =====================================================
+def init_search_index(app):
+    """
+    Create the FTS5 indexes and the triggers that keep them in sync.
+
+    The FTS tables are external-content tables over case_updates/messages,
+    so the text is not stored twice. A newly created index is rebuilt from
+    the existing rows. On databases without FTS5 (e.g. PostgreSQL) search
+    falls back to LIKE queries.
+    """
+    global fts_enabled
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != "sqlite":
+            fts_enabled = False
+            return False
+
+        try:
+            with engine.begin() as conn:
+                for table, (fts, column, _type) in FTS_INDEXES.items():
+                    exists = conn.exec_driver_sql(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+                    ).first()
+                    conn.exec_driver_sql(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                        f"{column}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+                    )
+                    conn.exec_driver_sql(
+                        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+                    )
+                    conn.exec_driver_sql(
+                        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+                    )
+                    conn.exec_driver_sql(
+                        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+                        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+                    )
+                    if not exists:
+                        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                        logger.info(f"🗂️ Built full-text index {fts}.")
+        except Exception as e:
+            logger.warning(f"⚠️ FTS5 unavailable, search will use LIKE scans. ({e})")
+            fts_enabled = False
+            return False
+
+    fts_enabled = True
+    return True
+
+def _fts_ready():
+    """Whether the FTS5 indexes exist; checked once per process, on first search."""
+    global fts_enabled
+    if fts_enabled is None:
+        if db.engine.dialect.name != "sqlite":
+            fts_enabled = False
+        else:
+            names = [fts for fts, _column, _type in FTS_INDEXES.values()]
+            found = db.session.execute(
+                db.text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN :names")
+                .bindparams(bindparam("names", expanding=True)),
+                {"names": names},
+            ).scalar()
+            fts_enabled = found == len(names)
+            if not fts_enabled:
+                logger.warning("⚠️ FTS5 indexes missing (run `flask bootstrap`), search will use LIKE scans.")
+    return fts_enabled
+
+# =====================================================
+# 🔎 Search
+# =====================================================
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so user input can't inject FTS operators; the last
+    word gets a prefix wildcard so results update while typing.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def escape_like(text):
+    """Escape LIKE wildcards so a search for "100%" matches the literal text."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _fts_search(table, match, limit):
+    fts, column, result_type = FTS_INDEXES[table]
+    rows = db.session.execute(
+        db.text(
+            f"SELECT src.id, src.client_id, src.created_at, clients.name, "
+            f"snippet({fts}, 0, '[', ']', '…', 16) AS snippet, bm25({fts}) AS rank "
+            f"FROM {fts} JOIN {table} AS src ON src.id = {fts}.rowid "
+            f"LEFT JOIN clients ON clients.id = src.client_id "
+            f"WHERE {fts} MATCH :match ORDER BY rank LIMIT :limit"
+        ).columns(created_at=db.DateTime),  # SQLite returns it as text; parse it like the ORM does
+        {"match": match, "limit": limit},
+    )
+    return [
+        {
+            "type": result_type,
+            "id": row.id,
+            "client_id": row.client_id,
+            "client_name": row.name,
+            "snippet": row.snippet,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "rank": row.rank,
+        }
+        for row in rows
+    ]
+
+def _like_search(table, text, limit):
+    model, column, result_type = {
+        "case_updates": (CaseUpdate, CaseUpdate.summary, "case_update"),
+        "messages": (Message, Message.message, "message"),
+    }[table]
+    rows = (
+        db.session.query(model, Client.name)
+        .outerjoin(Client, Client.id == model.client_id)
+        .filter(column.ilike(f"%{escape_like(text)}%", escape="\\"))
+        .order_by(model.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "type": result_type,
+            "id": item.id,
+            "client_id": item.client_id,
+            "client_name": name,
+            "snippet": (getattr(item, column.key) or "")[:200],
+            "created_at": item.created_at.isoformat() if item.created_at else None,
+            "rank": 0,
+        }
+        for item, name in rows
+    ]
+
+def search(text, limit=SEARCH_DEFAULT_LIMIT):
+    """Ranked matches across case update summaries and messages, best first."""
+    limit = max(1, min(limit or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+    if _fts_ready():
+        match = build_match_query(text)
+        if not match:
+            return []
+        results = [hit for table in FTS_INDEXES for hit in _fts_search(table, match, limit)]
+        # bm25() is lower-is-better; scores from the two indexes are merged as-is
+        results.sort(key=lambda hit: hit["rank"])
+    else:
+        text = (text or "").strip()
+        if not text:
+            return []
+        results = [hit for table in FTS_INDEXES for hit in _like_search(table, text, limit)]
+        results.sort(key=lambda hit: hit["created_at"] or "", reverse=True)
+    return results[:limit]
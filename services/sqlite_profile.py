@@ -0,0 +1,47 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# 🔧 SQLite performance profile
+# =====================================================
+# WAL lets the scheduler thread write CaseUpdates while gunicorn workers keep
+# reading; NORMAL sync is durable in WAL mode except on power loss; the busy
+# timeout makes writers queue for the lock instead of raising "database is locked".
+SQLITE_PROFILE_ENABLED = os.getenv("SQLITE_PROFILE_ENABLED", "true").lower() == "true"
+# busy_timeout goes first so switching journal_mode waits for the lock too.
+SQLITE_PRAGMAS = {
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, i.e. 64 MiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+def apply_sqlite_profile(dbapi_connection, pragmas=None):
+    """Run the profile's PRAGMAs on a raw sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in (pragmas or SQLITE_PRAGMAS).items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def init_sqlite_profile(app, db):
+    """Apply the profile to every new connection of the app's SQLite engine."""
+    from sqlalchemy import event
+
+    if not SQLITE_PROFILE_ENABLED:
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _connection_record):
+        apply_sqlite_profile(dbapi_connection)
+
+    logger.info(f"✅ SQLite profile applied: {SQLITE_PRAGMAS}")
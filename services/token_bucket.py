@@ -0,0 +1,99 @@
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from services.sqlite_profile import apply_sqlite_profile
+
+# SQLite buckets are dropped once they would be full again; this many calls between sweeps
+PRUNE_EVERY = 1000
+
+# =====================================================
+# 🪣 Token buckets
+# =====================================================
+# consume() returns 0.0 when the call may proceed, otherwise the number of
+# seconds until `cost` tokens will be available. `rate` is in tokens per
+# second and `burst` is the bucket capacity.
+
+def _refill(tokens, updated_at, now, rate, burst):
+    return min(burst, tokens + (now - updated_at) * rate)
+
+class MemoryTokenBuckets:
+    """
+    Per-process buckets; each gunicorn worker enforces its own limits.
+
+    Kept in least-recently-used order and capped at `max_keys`, so a flood
+    of new keys (login keys are attacker-chosen emails) evicts the idle
+    buckets in O(1) per call instead of scanning them all.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def consume(self, key, rate, burst, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (burst, now))
+            tokens = _refill(tokens, updated_at, now, rate, burst)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+class SQLiteTokenBuckets:
+    """
+    Buckets in a SQLite file, shared by every process on the host.
+
+    Each consume() is a single BEGIN IMMEDIATE transaction, so concurrent
+    workers serialize on the file lock instead of double-spending tokens.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        apply_sqlite_profile(self._conn)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " full_at REAL NOT NULL)"
+        )
+
+    def consume(self, key, rate, burst, cost=1.0):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+                if tokens >= cost:
+                    tokens -= cost
+                    wait = 0.0
+                else:
+                    wait = (cost - tokens) / rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (burst - tokens) / rate),
+                )
+                self._calls += 1
+                if self._calls % PRUNE_EVERY == 0:
+                    self._conn.execute("DELETE FROM token_buckets WHERE full_at < ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return wait
@@ -2,8 +2,18 @@ import os
 import logging
 from flask import Flask, render_template, redirect, url_for
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from models import db, User
+from extensions import migrate, database_uri, engine_options
 from services.scheduler import init_scheduler
+from services.llm_cache import init_llm_cache
+from services.sqlite_profile import init_sqlite_profile
+from services.dashboard_queries import load_dashboard
+from services.search import init_search_index
+from services.identity_cache import load_user_cached
+from services.login_throttle import init_login_throttle
+from services.rate_limit import init_rate_limiter
+from services.jobs import fail_interrupted_jobs
 from routes.dashboard import dash_bp
 
 
@@ -22,11 +32,32 @@ os.makedirs(app.instance_path, exist_ok=True)
 # =========================
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "fallback_secret_key")
 db_path = os.path.join(app.instance_path, "mycasecrm.db")
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+# Local SQLite file by default; set DATABASE_URL (e.g. postgresql://...) to share one store across hosts
+app.config["SQLALCHEMY_DATABASE_URI"] = database_uri(f"sqlite:///{db_path}")
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Trusted reverse proxies in front of the app (the Heroku router is one). Their
+# X-Forwarded-For/-Proto give request.remote_addr the real client address, which
+# per-IP login throttling depends on. Set to 0 when clients connect directly,
+# since the header is then client-controlled.
+PROXY_FIX_HOPS = int(os.getenv("PROXY_FIX_HOPS", "1"))
+if PROXY_FIX_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_HOPS, x_proto=PROXY_FIX_HOPS)
+
 # Initialize database
 db.init_app(app)
+migrate.init_app(app, db)
+
+# WAL, busy timeout and cache pragmas on every SQLite connection
+init_sqlite_profile(app, db)
+
+# Persistent LLM response cache (instance/llm_cache.sqlite3)
+init_llm_cache(app)
+init_login_throttle(app)
+
+# RingCentral / Graph send rates, shared by all workers (instance/rate_limits.sqlite3)
+init_rate_limiter(app)
 
 # =========================
 #  Login Manager
@@ -37,7 +68,8 @@ login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the in-process identity cache; only a miss queries `users`
+    return load_user_cached(user_id)
 
 # =========================
 #  Logging
@@ -58,7 +90,6 @@ try:
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(about_bp, url_prefix="/about")
     app.register_blueprint(api_bp, url_prefix="/api")
-    app.register_blueprint(dash_bp, url_prefix="/dashboard")
 
     logger.info("✅ Blueprints registered successfully.")
 except Exception as e:
@@ -67,18 +98,20 @@ except Exception as e:
 # =========================
 #  Scheduler
 # =========================
-try:
-    init_scheduler(app)
-    logger.info("✅ Scheduler started successfully.")
-except Exception as e:
-    logger.warning(f"⚠️ Scheduler not found. Skipping background tasks. ({e})")
+# Set SCHEDULER_ENABLED=false for one-off processes (e.g. `flask bootstrap`)
+if os.getenv("SCHEDULER_ENABLED", "true").lower() == "true":
+    try:
+        init_scheduler(app)
+        logger.info("✅ Scheduler started successfully.")
+    except Exception as e:
+        logger.warning(f"⚠️ Scheduler not found. Skipping background tasks. ({e})")
 
 # =========================
 #  Routes
 # =========================
 @app.route("/")
 def home():
-    return render_template("dashboard.html")
+    return render_template("dashboard.html", **load_dashboard())
 
 @app.route("/about")
 def about():
@@ -109,12 +142,58 @@ def ensure_admin_exists():
     else:
         logger.info("✅ Admin user already exists.")
 
-with app.app_context():
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    db.create_all()
-    ensure_admin_exists()
+# =========================
+#  Bootstrap
+# =========================
+# Importing this module does no database work, so gunicorn workers boot
+# fast. Schema, search indexes and the admin user are set up once per deploy
+# by `flask --app start_app bootstrap` (the Procfile release step).
+def bootstrap():
+    """Idempotent one-time setup: tables, FTS5 search indexes, the admin user and stale-job cleanup."""
+    with app.app_context():
+        db.create_all()
+        ensure_admin_exists()
+        fail_interrupted_jobs()
+    init_search_index(app)
     logger.info("✅ Database initialized and checked for admin user.")
 
+@app.cli.command("bootstrap")
+def bootstrap_command():
+    """Create tables, search indexes and the admin user (safe to re-run)."""
+    bootstrap()
+
+def init_local_database():
+    """
+    Per-process schema setup for a SQLite store: tables, search indexes and
+    the admin user. Interrupted jobs are left alone, since another worker
+    may be running them.
+    """
+    for attempt in range(2):
+        try:
+            with app.app_context():
+                db.create_all()
+                ensure_admin_exists()
+            init_search_index(app)
+            return
+        except Exception as e:
+            with app.app_context():
+                db.session.rollback()
+            if attempt:
+                raise
+            # Most likely a worker booting alongside this one created it first
+            logger.warning(f"⚠️ SQLite setup collided with another process, retrying: {e}")
+
+# Opt-in for SQLite deploys where the release phase runs on its own machine
+# and never sees the web processes' database file. Off by default, so
+# importing this module stays free of DB work; `python start_app.py` and the
+# bootstrap scripts run bootstrap() themselves and skip it.
+BOOTSTRAP_ON_IMPORT = os.getenv("BOOTSTRAP_ON_IMPORT", "false").lower() == "true"
+if BOOTSTRAP_ON_IMPORT and __name__ != "__main__":
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        init_local_database()
+    else:
+        logger.info("ℹ️ BOOTSTRAP_ON_IMPORT only applies to SQLite; run `flask bootstrap` instead.")
+
 # =========================
 #  Jinja Helper
 # =========================
@@ -126,24 +205,7 @@ def inject_now():
 # =========================
 #  Run App
 # =========================
-with app.app_context():
-    from models import db, User  # make sure models are imported
-    db.create_all()
-
-    # Ensure admin user exists
-    from werkzeug.security import generate_password_hash
-    if not User.query.filter_by(email="admin@casepulseai.com").first():
-        admin = User(
-            email="admin@casepulseai.com",
-            password_hash=generate_password_hash("admin123"),
-            role="admin"
-        )
-        db.session.add(admin)
-        db.session.commit()
-        print("✅ Admin user created on startup.")
-    else:
-        print("✅ Admin user already exists.")
-
 if __name__ == "__main__":
+    bootstrap()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+# The app reads its configuration at import time, so point it at a scratch
+# database and switch off background work before anything imports start_app.
+_tmp = tempfile.mkdtemp(prefix="casepulse-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'test.db')}")
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """The application with a freshly created schema, inside an app context."""
+    from start_app import app as flask_app
+    from extensions import db
+    from services.identity_cache import identity_cache
+
+    identity_cache.clear()  # user ids are reused across tests
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def user(app):
+    from extensions import db
+    from models import User
+
+    account = User(email="staff@example.com", role="admin")
+    account.set_password("correct horse")
+    db.session.add(account)
+    db.session.commit()
+    return account
+
+
+@pytest.fixture
+def logged_in(app, user):
+    """A test client with `user` signed in."""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client
+
+
+@pytest.fixture
+def http_stub():
+    """Start a local HTTP server for a BaseHTTPRequestHandler class and return its base URL."""
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+
+import pytest
+
+from extensions import db
+from models import CaseUpdate, Client, Message
+from services import ai_agent
+
+
+def _client_with_message():
+    client = Client(name="Ada", email="ada@example.com")
+    db.session.add(client)
+    db.session.flush()
+    db.session.add(Message(client_id=client.id, message="Hearing scheduled"))
+    db.session.commit()
+    return client
+
+
+def test_message_arriving_during_the_model_call_is_still_new(app, monkeypatch):
+    client = _client_with_message()
+
+    def slow_model(cases, max_workers=None):
+        # A message lands while the request is in flight
+        db.session.add(Message(client_id=client.id, message="Judge asked for documents"))
+        db.session.flush()
+        return {key: "summary" for key in cases}
+
+    monkeypatch.setattr(ai_agent, "complete_case_prompts", slow_model)
+    assert len(ai_agent.analyze_all_client_cases()) == 1
+    assert CaseUpdate.query.count() == 1
+    assert ai_agent.get_changed_clients() == [client]
+
+
+def test_unchanged_client_is_skipped(app, monkeypatch):
+    _client_with_message()
+    monkeypatch.setattr(ai_agent, "complete_case_prompts", lambda cases, max_workers=None: {k: "s" for k in cases})
+    assert len(ai_agent.analyze_all_client_cases()) == 1
+    assert ai_agent.get_changed_clients() == []
+    assert ai_agent.analyze_all_client_cases() == []
+
+
+def test_complete_prompts_caps_calls_in_flight(monkeypatch):
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+    timeouts = []
+
+    def fake_complete_prompt(prompt, timeout=None, **options):
+        timeouts.append(timeout)
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        return f"reply to {prompt}"
+
+    monkeypatch.setattr(ai_agent, "AI_ENGINE", "threads")
+    monkeypatch.setattr(ai_agent, "client", object())
+    monkeypatch.setattr(ai_agent, "complete_prompt", fake_complete_prompt)
+    prompts = {key: f"prompt {key}" for key in range(12)}
+
+    results = ai_agent.complete_prompts(prompts, max_workers=3, timeout=5)
+
+    assert results == {key: f"reply to prompt {key}" for key in range(12)}
+    assert state["peak"] == 3
+    assert timeouts == [5] * 12
+
+
+def test_failed_or_timed_out_prompts_map_to_none(monkeypatch):
+    def fake_complete_prompt(prompt, timeout=None, **options):
+        if prompt == "slow":
+            raise TimeoutError("Request timed out.")
+        if prompt == "broken":
+            raise RuntimeError("Bad gateway")
+        return "ok"
+
+    monkeypatch.setattr(ai_agent, "AI_ENGINE", "threads")
+    monkeypatch.setattr(ai_agent, "client", object())
+    monkeypatch.setattr(ai_agent, "complete_prompt", fake_complete_prompt)
+
+    results = ai_agent.complete_prompts({"a": "fine", "b": "slow", "c": "broken"}, max_workers=2)
+    assert results == {"a": "ok", "b": None, "c": None}
+
+
+class FakeModel:
+    """Stands in for complete_prompts: batch requests get `reply(case_ids)`, single ones a fixed text."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.batches = []
+        self.singles = []
+
+    def __call__(self, prompts, max_workers=None, **options):
+        if options.get("system_prompt") != ai_agent.BATCH_SYSTEM_PROMPT:
+            self.singles += list(prompts)
+            return {key: f"single {key}" for key in prompts}
+        replies = {}
+        for index, prompt in prompts.items():
+            ids = [case["id"] for case in json.loads(prompt)]
+            self.batches.append(ids)
+            replies[index] = self.reply(ids)
+        return replies
+
+
+def _answer_all(ids):
+    return json.dumps({"results": [{"id": case_id, "summary": f"batched {case_id}"} for case_id in ids]})
+
+
+def _cases(*keys, activity="- hearing moved"):
+    return {key: (f"Client {key}", activity, f"single prompt {key}") for key in keys}
+
+
+@pytest.fixture
+def batch_mode(monkeypatch):
+    monkeypatch.setattr(ai_agent, "AI_BATCH_MODE", True)
+
+
+def test_pack_batches_respects_token_budget_and_client_cap():
+    overhead = ai_agent.estimate_tokens(ai_agent.BATCH_SYSTEM_PROMPT)
+    entries = {key: "x" * 396 for key in range(7)}  # 100 tokens each
+
+    assert ai_agent.pack_batches(entries, budget=overhead + 250, max_clients=10) == [[0, 1], [2, 3], [4, 5], [6]]
+    assert ai_agent.pack_batches(entries, budget=overhead + 10_000, max_clients=3) == [[0, 1, 2], [3, 4, 5], [6]]
+    # A case bigger than the budget still gets a batch of its own
+    assert ai_agent.pack_batches({"big": "x" * 4000}, budget=overhead + 100) == [["big"]]
+
+
+def test_singleton_batches_use_the_single_prompt(batch_mode, monkeypatch):
+    model = FakeModel(_answer_all)
+    monkeypatch.setattr(ai_agent, "complete_prompts", model)
+
+    # ~2,500 tokens of activity each: two cases fit the default budget, the third is left alone
+    summaries = ai_agent.complete_case_prompts(_cases(1, 2, 3, activity="x" * 10_000))
+
+    assert model.batches == [["1", "2"]]
+    assert model.singles == [3]
+    assert summaries == {1: "batched 1", 2: "batched 2", 3: "single 3"}
+
+
+def test_missing_ids_fall_back_to_single_calls(batch_mode, monkeypatch):
+    model = FakeModel(lambda ids: json.dumps({"results": [
+        {"id": "1", "summary": "batched 1"},
+        {"id": "3", "summary": "   "},  # empty summaries count as missing
+    ]}))
+    monkeypatch.setattr(ai_agent, "complete_prompts", model)
+
+    summaries = ai_agent.complete_case_prompts(_cases(1, 2, 3))
+
+    assert model.singles == [2, 3]
+    assert summaries == {1: "batched 1", 2: "single 2", 3: "single 3"}
+
+
+def test_invalid_json_reply_retries_the_whole_batch_singly(batch_mode, monkeypatch):
+    model = FakeModel(lambda ids: '{"results": [{"id": "1", "summary": "trunc')
+    monkeypatch.setattr(ai_agent, "complete_prompts", model)
+
+    assert ai_agent.complete_case_prompts(_cases(1, 2)) == {1: "single 1", 2: "single 2"}
+    assert model.singles == [1, 2]
+
+    with pytest.raises(ValueError):
+        ai_agent.parse_batch_summaries('["not", "an", "object"]', {"1"})
+
+
+def test_int_keys_match_string_and_numeric_reply_ids(batch_mode, monkeypatch):
+    # Ids go out as strings; the model may echo them back as strings or numbers
+    model = FakeModel(lambda ids: json.dumps({"results": [
+        {"id": "7", "summary": "string id"},
+        {"id": 8, "summary": "numeric id"},
+    ]}))
+    monkeypatch.setattr(ai_agent, "complete_prompts", model)
+
+    summaries = ai_agent.complete_case_prompts(_cases(7, 8))
+
+    assert model.batches == [["7", "8"]]
+    assert model.singles == []
+    assert summaries == {7: "string id", 8: "numeric id"}
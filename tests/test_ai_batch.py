@@ -0,0 +1,216 @@
+import json
+import re
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from openai import OpenAI
+
+from extensions import db
+from models import AIBatchRun, AnalysisWatermark, CaseUpdate, Client, Message
+from services import ai_agent, ai_batch
+
+
+def _success(request):
+    content = f"nightly summary for {request['custom_id']}"
+    return json.dumps({
+        "id": "req", "custom_id": request["custom_id"], "error": None,
+        "response": {"status_code": 200, "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}},
+    })
+
+
+class OpenAIBatchStub(BaseHTTPRequestHandler):
+    """Files + Batches endpoints; a batch finishes on its second retrieve."""
+
+    files = {}
+    batches = {}
+    final_status = "completed"
+    broken_batches = set()  # batch ids whose retrieve answers 500
+
+    @staticmethod
+    def output(requests):
+        return [_success(r) for r in requests]
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _batch(self, batch):
+        return {
+            "id": batch["id"], "object": "batch", "endpoint": "/v1/chat/completions",
+            "input_file_id": batch["input"], "completion_window": "24h", "status": batch["status"],
+            "created_at": 0, "output_file_id": batch.get("output"), "error_file_id": None, "errors": None,
+        }
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/files"):
+            # The JSONL upload sits inside a multipart body; keep just the request lines
+            lines = [line for line in body.decode().splitlines() if line.startswith('{"custom_id"')]
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = "\n".join(lines)
+            return self._send({"id": file_id, "object": "file", "bytes": len(body), "created_at": 0,
+                               "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+        if self.path.endswith("/batches"):
+            request = json.loads(body)
+            batch_id = f"batch_{len(self.batches) + 1}"
+            self.batches[batch_id] = {"id": batch_id, "input": request["input_file_id"], "status": "validating", "polls": 0}
+            return self._send(self._batch(self.batches[batch_id]))
+        self._send({}, 404)
+
+    def do_GET(self):
+        match = re.search(r"/batches/([^/]+)$", self.path)
+        if match:
+            if match.group(1) in self.broken_batches:
+                return self._send({"error": {"message": "boom"}}, 500)
+            batch = self.batches[match.group(1)]
+            batch["polls"] += 1
+            if batch["polls"] == 1:
+                batch["status"] = "in_progress"
+            elif batch["status"] == "in_progress":
+                requests = [json.loads(line) for line in self.files[batch["input"]].splitlines()]
+                output_id = f"file-out-{batch['id']}"
+                self.files[output_id] = "\n".join(self.output(requests))
+                batch["status"], batch["output"] = self.final_status, output_id
+            return self._send(self._batch(batch))
+        match = re.search(r"/files/([^/]+)/content$", self.path)
+        if match:
+            return self._send(self.files[match.group(1)].encode())
+        self._send({}, 404)
+
+
+@pytest.fixture
+def stub(app, http_stub, monkeypatch):
+    handler = type("Stub", (OpenAIBatchStub,), {"files": {}, "batches": {}, "broken_batches": set()})
+    base_url = http_stub(handler)
+    monkeypatch.setattr(ai_agent, "client", OpenAI(api_key="test-key", base_url=f"{base_url}/v1", max_retries=0))
+    return handler
+
+
+@pytest.fixture
+def clients(app):
+    rows = [Client(name=f"Client {i}", email=f"c{i}@example.com") for i in range(1, 4)]
+    db.session.add_all(rows)
+    db.session.flush()
+    db.session.add_all(Message(client_id=c.id, message=f"Hearing moved for {c.name}") for c in rows)
+    db.session.commit()
+    return rows
+
+
+def _summaries():
+    return {u.client_id: u.summary for u in CaseUpdate.query.order_by(CaseUpdate.id)}
+
+
+def test_submit_poll_and_bulk_insert(stub, clients):
+    [run] = ai_batch.submit_analysis_batch(only_changed=False)
+    assert (run.total_requests, run.status, run.provider_status) == (3, "submitted", "validating")
+
+    ai_batch.poll_batch_runs()
+    assert run.provider_status == "in_progress" and CaseUpdate.query.count() == 0
+
+    ai_batch.poll_batch_runs()
+    assert (run.status, run.succeeded_requests, run.failed_requests) == ("completed", 3, 0)
+    assert _summaries() == {c.id: f"nightly summary for client-{c.id}" for c in clients}
+    watermarks = AnalysisWatermark.query.all()
+    assert {w.analyzed_at for w in watermarks} == {run.created_at}
+    assert ai_agent.get_changed_clients() == []
+
+
+def test_large_book_is_split_into_several_batches(stub, clients, monkeypatch):
+    monkeypatch.setattr(ai_batch, "AI_BATCH_MAX_REQUESTS", 2)
+    runs = ai_batch.submit_analysis_batch(only_changed=False)
+    assert [run.total_requests for run in runs] == [2, 1]
+
+
+def test_expired_batch_stores_partial_output(stub, clients):
+    stub.final_status = "expired"
+    stub.output = staticmethod(lambda requests: [_success(requests[0])])
+
+    [run] = ai_batch.submit_analysis_batch(only_changed=False)
+    ai_batch.poll_batch_runs()
+    ai_batch.poll_batch_runs()
+
+    assert (run.status, run.succeeded_requests, run.failed_requests) == ("failed", 1, 2)
+    assert run.error == "Batch expired"
+    assert list(_summaries()) == [clients[0].id]
+    # The clients without a result are still due for analysis
+    assert {c.id for c in ai_agent.get_changed_clients()} == {clients[1].id, clients[2].id}
+
+
+def test_malformed_output_line_only_fails_that_request(stub, clients):
+    def output(requests):
+        lines = [_success(r) for r in requests]
+        lines[1] = lines[1][: len(lines[1]) // 2]  # truncated line
+        return lines
+
+    stub.output = staticmethod(output)
+    [run] = ai_batch.submit_analysis_batch(only_changed=False)
+    ai_batch.poll_batch_runs()
+    ai_batch.poll_batch_runs()
+
+    assert (run.status, run.succeeded_requests, run.failed_requests) == ("completed", 2, 1)
+    assert set(_summaries()) == {clients[0].id, clients[2].id}
+
+
+def test_live_reanalysis_drops_older_batch_result(stub, clients):
+    [run] = ai_batch.submit_analysis_batch(only_changed=False)
+    # Client 1 is analyzed live after the batch was submitted
+    ai_agent.record_analysis(clients[0], "live summary", "live-hash")
+    db.session.commit()
+
+    ai_batch.poll_batch_runs()
+    ai_batch.poll_batch_runs()
+
+    assert run.succeeded_requests == 2
+    summaries = [(u.client_id, u.summary) for u in CaseUpdate.query.filter_by(client_id=clients[0].id)]
+    assert summaries == [(clients[0].id, "live summary")]
+    assert db.session.get(AnalysisWatermark, clients[0].id).content_hash == "live-hash"
+
+
+def test_one_failing_run_does_not_block_the_others(stub, clients, monkeypatch):
+    monkeypatch.setattr(ai_batch, "AI_BATCH_MAX_REQUESTS", 2)
+    first, second = ai_batch.submit_analysis_batch(only_changed=False)
+    stub.broken_batches.add(first.batch_id)
+
+    ai_batch.poll_batch_runs()
+    ai_batch.poll_batch_runs()
+
+    assert db.session.get(AIBatchRun, first.id).status == "submitted"
+    assert db.session.get(AIBatchRun, second.id).status == "completed"
+    assert list(_summaries()) == [clients[2].id]
+
+
+def test_submission_query_count_does_not_grow_with_the_book(stub, clients, monkeypatch):
+    from sqlalchemy import event
+
+    extra = [Client(name=f"Client {i}") for i in range(4, 41)]
+    db.session.add_all(extra)
+    db.session.flush()
+    db.session.add_all(Message(client_id=c.id, message=f"Filing due for {c.name}") for c in extra)
+    db.session.commit()
+    monkeypatch.setattr(ai_batch, "PROMPT_CHUNK_SIZE", 25)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        [run] = ai_batch.submit_analysis_batch(only_changed=False)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert run.total_requests == 40
+    # ids, then clients + histories per chunk of 25, then the run insert
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1 + 2 * 2
+
+
+def test_batched_histories_match_the_single_client_prompt(app, clients):
+    db.session.add(Message(client_id=clients[0].id, message="Second note"))
+    db.session.commit()
+    histories = ai_agent.case_histories(clients)
+    assert histories == {c.id: ai_agent.case_history(c) for c in clients}
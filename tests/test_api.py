@@ -0,0 +1,17 @@
+import pytest
+
+OPERATIONAL_ENDPOINTS = [
+    "/api/cache/stats",
+    "/api/rate-limits",
+    "/api/ai-batches",
+]
+
+
+@pytest.mark.parametrize("path", OPERATIONAL_ENDPOINTS)
+def test_operational_endpoints_require_login(app, path):
+    assert app.test_client().get(path).status_code == 302
+
+
+@pytest.mark.parametrize("path", OPERATIONAL_ENDPOINTS)
+def test_operational_endpoints_serve_signed_in_users(logged_in, path):
+    assert logged_in.get(path).status_code == 200
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from services import async_engine
+
+
+class GraphBatchStub(BaseHTTPRequestHandler):
+    """Graph $batch endpoint: accepts every email, but answers a garbled 200 for bad@example.com."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if "bad@example.com" in json.dumps(body):
+            data = b"<html>upstream proxy error</html>"
+        else:
+            data = json.dumps({"responses": [{"id": r["id"], "status": 202} for r in body["requests"]]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Provider:
+    def get_token(self):
+        return "token"
+
+    def invalidate(self):
+        pass
+
+
+def test_unreadable_batch_body_fails_only_its_chunk(http_stub, monkeypatch):
+    monkeypatch.setattr(async_engine, "GRAPH_API_BASE", http_stub(GraphBatchStub))
+    good = [(1, "a@example.com", "Hi", "Body"), (2, "b@example.com", "Hi", "Body")]
+    bad = [(3, "bad@example.com", "Hi", "Body")]
+
+    async def run():
+        async with async_engine._http_client() as http:
+            slots = asyncio.Semaphore(2)
+            return await asyncio.gather(
+                async_engine.asend_email_chunk(http, _Provider(), "staff@example.com", good, slots),
+                async_engine.asend_email_chunk(http, _Provider(), "staff@example.com", bad, slots),
+            )
+
+    good_results, bad_results = asyncio.run(run())
+    assert {key: r["ok"] for key, r in good_results.items()} == {1: True, 2: True}
+    assert bad_results[3]["ok"] is False and bad_results[3]["status"] == 0
+
+
+def test_cache_lookups_run_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class Cache:
+        def make_key(self, *args):
+            return repr(args)
+
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return "cached summary"
+
+    monkeypatch.setattr(async_engine, "get_llm_cache", lambda: Cache())
+    results = asyncio.run(async_engine.acomplete_prompts({"a": "prompt a", "b": "prompt b"}))
+
+    assert results == {"a": "cached summary", "b": "cached summary"}
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,90 @@
+import io
+import json
+
+from models import Client
+from services import client_import
+from services.client_import import import_clients
+
+
+def _upload(text):
+    return io.BytesIO(text.encode())
+
+
+def _names():
+    return sorted(name for (name,) in Client.query.with_entities(Client.name))
+
+
+def test_csv_bad_rows_are_reported_and_the_rest_inserted(app):
+    csv_text = (
+        "Name,Email,Phone\n"
+        "Ada,ada@example.com,555-0100\n"
+        ",nobody@example.com,\n"
+        "Bob,not-an-email,\n"
+        "Cy,cy@example.com,\n"
+    )
+    report = import_clients(_upload(csv_text), "csv", batch_size=1)
+
+    assert report["inserted"] == 2 and report["rejected"] == 2
+    assert [error["row"] for error in report["errors"]] == [3, 4]
+    assert "fatal_error" not in report
+    assert _names() == ["Ada", "Cy"]
+
+
+def test_ndjson_skips_blank_and_unparseable_lines(app):
+    lines = [
+        json.dumps({"name": "Ada", "email": "ada@example.com"}),
+        "",
+        "{not json",
+        json.dumps(["Bob", "bob@example.com"]),
+        json.dumps({"name": "Cy", "email": "cy@example.com", "phone": 5550100}),
+    ]
+    report = import_clients(_upload("\n".join(lines)), "ndjson")
+
+    assert report["inserted"] == 2
+    assert [(e["row"], e["error"].split(":")[0]) for e in report["errors"]] == [
+        (3, "Unparseable row"),
+        (4, "Row must be an object with name/email/phone fields"),
+    ]
+    assert Client.query.filter_by(name="Cy").one().phone == "5550100"
+
+
+def test_json_array_is_read_across_chunk_boundaries(app, monkeypatch):
+    monkeypatch.setattr(client_import, "JSON_CHUNK_SIZE", 16)
+    rows = [{"name": f"Client {i}", "email": f"c{i}@example.com"} for i in range(5)]
+    rows.insert(2, {"name": "No email"})
+
+    report = import_clients(_upload(json.dumps(rows)), "json", batch_size=2)
+
+    assert report["inserted"] == 5
+    assert report["errors"] == [{"row": 3, "error": "Missing client name or email"}]
+
+
+def test_fatal_parse_error_keeps_committed_batches(app):
+    text = '[{"name": "Ada", "email": "ada@example.com"}, {"name": "Bob", "email": "bob@example.com"}, {"name": '
+
+    report = import_clients(_upload(text), "json", batch_size=1)
+
+    assert report["inserted"] == 2
+    assert report["fatal_error"] == "Malformed JSON at element 3"
+    assert _names() == ["Ada", "Bob"]
+
+
+def test_json_upload_that_is_not_an_array_is_fatal(app):
+    report = import_clients(_upload('{"name": "Ada"}'), "json")
+    assert report["inserted"] == 0
+    assert "must be an array" in report["fatal_error"]
+
+
+def test_import_endpoint_reports_rows_and_rejects_fatal_uploads(logged_in):
+    ok = logged_in.post(
+        "/api/clients/import",
+        data=json.dumps({"name": "Ada", "email": "ada@example.com"}) + "\n",
+        content_type="application/x-ndjson",
+    )
+    assert ok.status_code == 200 and ok.get_json()["inserted"] == 1
+
+    fatal = logged_in.post("/api/clients/import?format=json", data="not json", content_type="text/plain")
+    assert fatal.status_code == 400 and "fatal_error" in fatal.get_json()
+
+    unknown = logged_in.post("/api/clients/import", data="x", content_type="text/plain")
+    assert unknown.status_code == 400
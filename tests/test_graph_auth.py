@@ -0,0 +1,100 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+from services import graph_auth, notifications
+from services.graph_auth import GraphTokenProvider
+
+
+class FakeMSAL:
+    """Stands in for ConfidentialClientApplication: hands out numbered tokens."""
+
+    def __init__(self, expires_in=3600):
+        self.expires_in = expires_in
+        self.calls = 0
+
+    def acquire_token_for_client(self, scopes):
+        self.calls += 1
+        return {"access_token": f"token-{self.calls}", "expires_in": self.expires_in}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+class RevokingGraphStub(BaseHTTPRequestHandler):
+    """Graph $batch endpoint that answers 401 to token-1, as if it had been revoked."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.headers.get("Authorization") == "Bearer token-1":
+            status, data = 401, {"error": {"code": "InvalidAuthenticationToken", "message": "Token revoked"}}
+        else:
+            status, data = 200, {"responses": [{"id": r["id"], "status": 202} for r in body["requests"]]}
+        data = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _provider(monkeypatch, msal):
+    clock = Clock()
+    monkeypatch.setattr(graph_auth, "time", clock)
+    monkeypatch.setattr(graph_auth, "ConfidentialClientApplication", lambda *args, **kwargs: msal)
+    provider = GraphTokenProvider("client-id", "client-secret", "https://login.microsoftonline.com/tenant")
+    return provider, clock
+
+
+def test_token_is_reused_until_the_refresh_margin(monkeypatch):
+    msal = FakeMSAL(expires_in=3600)
+    provider, clock = _provider(monkeypatch, msal)
+
+    assert provider.get_token() == "token-1"
+    clock.now += 3600 - graph_auth.GRAPH_TOKEN_REFRESH_MARGIN - 1
+    assert provider.get_token() == "token-1"
+    assert provider.token_requests == 1
+
+    clock.now += 1  # now inside the margin
+    assert provider.get_token() == "token-2"
+    assert provider.token_requests == 2
+
+
+def test_invalidate_after_a_401_fetches_a_new_token(monkeypatch):
+    provider, _clock = _provider(monkeypatch, FakeMSAL())
+    assert provider.get_token() == "token-1"
+
+    provider.invalidate()
+    assert provider.get_token() == "token-2"
+    assert provider.get_token() == "token-2"
+
+
+def test_refused_token_request_is_not_cached(monkeypatch):
+    msal = FakeMSAL()
+    refused = {"error": "invalid_client", "error_description": "bad secret"}
+    monkeypatch.setattr(msal, "acquire_token_for_client", lambda scopes: refused)
+    provider, _clock = _provider(monkeypatch, msal)
+
+    assert provider.get_token() is None
+    assert provider.get_token() is None
+    assert provider.token_requests == 2
+
+
+def test_graph_401_drops_the_token_for_the_next_send(http_stub, monkeypatch):
+    monkeypatch.setattr(notifications, "GRAPH_API_BASE", http_stub(RevokingGraphStub))
+    provider, _clock = _provider(monkeypatch, FakeMSAL())
+    emails = [(1, "a@example.com", "Update", "Body")]
+
+    first = notifications.send_outlook_emails_batch(emails, token_provider=provider)
+    second = notifications.send_outlook_emails_batch(emails, token_provider=provider)
+
+    assert first[1]["ok"] is False and first[1]["status"] == 401
+    assert second[1] == {"ok": True, "status": 202, "error": None}
+    assert provider.token_requests == 2
@@ -0,0 +1,61 @@
+import pytest
+from http.server import BaseHTTPRequestHandler
+
+from services import http_client
+
+
+class FlakyStub(BaseHTTPRequestHandler):
+    """Answers 503 to the first request of each method, 200 afterwards; keeps connections alive."""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+    peers = set()
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.requests.append(self.command)
+        self.peers.add(self.client_address)
+        status = 503 if self.requests.count(self.command) == 1 else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_GET = do_POST = _answer
+
+
+@pytest.fixture
+def stub(http_stub):
+    handler = type("Stub", (FlakyStub,), {"requests": [], "peers": set()})
+    handler.base_url = http_stub(handler)
+    return handler
+
+
+def test_session_pool_timeout_and_retry_settings():
+    session = http_client.build_session(pool_maxsize=7, max_retries=2, timeout=(1, 9))
+    adapter = session.get_adapter("https://graph.microsoft.com")
+    retry = adapter.max_retries
+
+    assert adapter._pool_maxsize == 7
+    assert session.timeout == (1, 9)
+    assert retry.total == 2
+    assert set(retry.status_forcelist) == {500, 502, 503, 504}
+    assert "GET" in retry.allowed_methods and "POST" not in retry.allowed_methods
+    assert retry.respect_retry_after_header
+
+
+def test_get_is_retried_on_503_but_post_is_sent_once(stub):
+    session = http_client.build_session(backoff_factor=0)
+
+    assert session.get(f"{stub.base_url}/status").status_code == 200
+    assert session.post(f"{stub.base_url}/sendMail", json={}).status_code == 503
+    assert stub.requests == ["GET", "GET", "POST"]
+    assert len(stub.peers) == 1  # every call went over the same kept-alive socket
+
+
+def test_get_session_returns_one_session_per_integration():
+    assert http_client.get_session("graph") is http_client.get_session("graph")
+    assert http_client.get_session("graph") is not http_client.get_session("ringcentral")
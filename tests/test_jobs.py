@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import AnalysisJob, Client
+from services import jobs
+
+
+def test_job_routes_require_login(app):
+    client = app.test_client()
+    assert client.post("/api/jobs", json={}).status_code == 302
+    assert client.get("/api/jobs/1").status_code == 302
+
+
+def test_signed_in_user_can_read_job(logged_in):
+    job = AnalysisJob(status="completed", total_clients=2, processed_clients=2, succeeded_clients=2)
+    db.session.add(job)
+    db.session.commit()
+    response = logged_in.get(f"/api/jobs/{job.id}")
+    assert response.status_code == 200
+    assert response.get_json()["progress"] == 100
+
+
+def _aged(seconds):
+    return datetime.utcnow() - timedelta(seconds=seconds)
+
+
+def test_bootstrap_fails_only_jobs_without_a_heartbeat(app):
+    from start_app import bootstrap
+
+    stale = jobs.ANALYSIS_JOB_STALE_AFTER + 60
+    db.session.add_all([
+        AnalysisJob(status="queued", heartbeat_at=_aged(stale)),
+        AnalysisJob(status="running", heartbeat_at=_aged(stale)),
+        AnalysisJob(status="running", heartbeat_at=_aged(5)),  # an old dyno still working on it
+        AnalysisJob(status="completed", heartbeat_at=_aged(stale)),
+    ])
+    db.session.commit()
+
+    bootstrap()
+    db.session.expire_all()
+    assert [job.status for job in AnalysisJob.query.order_by(AnalysisJob.id)] == ["failed", "failed", "running", "completed"]
+    assert jobs.fail_interrupted_jobs() == 0
+
+
+def test_polling_a_dead_job_reports_it_failed(logged_in):
+    job = AnalysisJob(status="running", heartbeat_at=_aged(jobs.ANALYSIS_JOB_STALE_AFTER + 1))
+    db.session.add(job)
+    db.session.commit()
+
+    body = logged_in.get(f"/api/jobs/{job.id}").get_json()
+    assert body["status"] == "failed" and "No progress" in body["error"]
+
+
+def test_worker_completes_job_and_renews_heartbeat(app, monkeypatch):
+    db.session.add_all(Client(name=f"Client {i}") for i in range(3))
+    job = AnalysisJob(status="queued", heartbeat_at=_aged(60))
+    db.session.add(job)
+    db.session.commit()
+    monkeypatch.setattr(jobs, "JOB_CHUNK_SIZE", 2)
+    monkeypatch.setattr(jobs, "analyze_clients", lambda clients, only_changed: [(c, "ok") for c in clients])
+
+    jobs.run_analysis_job(job.id)
+    db.session.expire_all()
+    assert (job.status, job.processed_clients, job.succeeded_clients, job.error) == ("completed", 3, 3, None)
+    assert job.heartbeat_at > _aged(5)
+
+
+def test_worker_does_not_overwrite_a_job_failed_under_it(app, monkeypatch):
+    db.session.add_all(Client(name=f"Client {i}") for i in range(3))
+    job = AnalysisJob(status="queued")
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+    chunks = []
+
+    def analyze(clients, only_changed):
+        chunks.append(len(clients))
+        # A release-phase bootstrap decides the job is dead while it is still running
+        db.session.execute(db.update(AnalysisJob).where(AnalysisJob.id == job_id)
+                           .values(heartbeat_at=_aged(jobs.ANALYSIS_JOB_STALE_AFTER + 1)))
+        db.session.commit()
+        jobs.fail_interrupted_jobs()
+        return [(c, "ok") for c in clients]
+
+    monkeypatch.setattr(jobs, "JOB_CHUNK_SIZE", 2)
+    monkeypatch.setattr(jobs, "analyze_clients", analyze)
+
+    jobs.run_analysis_job(job_id)
+    db.session.expire_all()
+    job = db.session.get(AnalysisJob, job_id)
+    assert job.status == "failed" and "No progress" in job.error
+    assert chunks == [2]  # the worker stopped instead of finishing the job
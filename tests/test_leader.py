@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import SchedulerLease
+from services import leader
+
+
+@pytest.fixture(autouse=True)
+def not_leader(monkeypatch):
+    monkeypatch.setattr(leader, "_leader_until", 0.0)
+
+
+def test_non_leader_skips_leader_only_jobs(app, monkeypatch):
+    calls = []
+    job = leader.leader_only(lambda: calls.append("ran") or "done")
+
+    assert job() is None and calls == []
+
+    # Another process holds the lease, so the heartbeat does not make us leader
+    assert leader.try_acquire_lease(holder="other-process")
+    assert leader.heartbeat(app) is False
+    assert job() is None and calls == []
+
+    db.session.execute(db.update(SchedulerLease).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    assert leader.heartbeat(app) is True
+    assert job() == "done" and calls == ["ran"]
+
+
+def test_renewal_keeps_the_lease(app):
+    assert leader.heartbeat(app)
+    first = db.session.get(SchedulerLease, leader.LEADER_LEASE_NAME).expires_at
+
+    assert leader.heartbeat(app)
+    db.session.expire_all()
+    lease = db.session.get(SchedulerLease, leader.LEADER_LEASE_NAME)
+    assert lease.holder == leader.HOLDER_ID and lease.expires_at >= first
+    # A second instance cannot take a lease that is being renewed
+    assert not leader.try_acquire_lease(holder="standby")
+
+
+def test_standby_takes_over_once_the_ttl_lapses(app, monkeypatch):
+    assert leader.try_acquire_lease(holder="primary", ttl=60)
+    assert not leader.try_acquire_lease(holder="standby", ttl=60)
+
+    # The primary stops renewing; a minute later its lease has lapsed
+    later = datetime.utcnow() + timedelta(seconds=61)
+    monkeypatch.setattr(leader, "datetime", type("Later", (), {"utcnow": staticmethod(lambda: later)}))
+    assert leader.try_acquire_lease(holder="standby", ttl=60)
+    assert not leader.try_acquire_lease(holder="primary", ttl=60)
+
+    db.session.expire_all()
+    assert db.session.get(SchedulerLease, leader.LEADER_LEASE_NAME).holder == "standby"
+
+
+def test_leadership_ends_when_the_lease_would_expire(app, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(leader, "time", type("Clock", (), {"monotonic": staticmethod(lambda: clock[0])}))
+    assert leader.heartbeat(app) and leader.is_leader()
+
+    # No heartbeat for a whole TTL: stop acting as leader, even before anyone takes over
+    clock[0] += leader.LEADER_LEASE_TTL
+    assert not leader.is_leader()
@@ -0,0 +1,13 @@
+from services.llm_cache import LLMCache
+
+
+def test_workers_sharing_a_file_respect_max_entries(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    first, second = LLMCache(path, max_entries=3), LLMCache(path, max_entries=3)
+
+    for i in range(6):
+        (first if i % 2 else second).set(f"key-{i}", f"response {i}")
+
+    assert first.stats()["entries"] == second.stats()["entries"] == 3
+    # The least recently written entries went first, whichever worker wrote them
+    assert [first.get(f"key-{i}") for i in range(6)] == [None, None, None, "response 3", "response 4", "response 5"]
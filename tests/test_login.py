@@ -0,0 +1,56 @@
+from services import login_throttle
+
+
+def _login(client, ip, email="staff@example.com", password="wrong"):
+    return client.post(
+        "/auth/login",
+        data={"email": email, "password": password},
+        headers={"X-Forwarded-For": ip},
+    )
+
+
+def test_per_ip_bucket_uses_forwarded_client_address(app, user, monkeypatch):
+    monkeypatch.setattr(login_throttle, "login_buckets", login_throttle.MemoryTokenBuckets())
+    monkeypatch.setattr(login_throttle, "LOGIN_IP_BURST", 2)
+    monkeypatch.setattr(login_throttle, "LOGIN_ACCOUNT_BURST", 100)
+    client = app.test_client()
+
+    assert [_login(client, "203.0.113.7").status_code for _ in range(3)] == [200, 200, 429]
+    # Another client behind the same router still has its own bucket
+    assert _login(client, "198.51.100.4").status_code == 200
+
+
+def test_short_form_hash_method_does_not_rehash_every_login(app, monkeypatch):
+    import models
+
+    for method in ("scrypt", "pbkdf2:sha256"):
+        monkeypatch.setattr(models, "PASSWORD_HASH_METHOD", method)
+        account = models.User(email=f"{method}@example.com")
+        account.set_password("secret")
+        stored = account.password_hash
+
+        assert not account.password_needs_rehash()
+        assert login_throttle.verify_password(account, "secret")
+        assert account.password_hash == stored
+
+
+def test_hash_under_old_method_is_upgraded(app, monkeypatch):
+    import models
+
+    monkeypatch.setattr(models, "PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+    account = models.User(email="old@example.com")
+    account.set_password("secret")
+    monkeypatch.setattr(models, "PASSWORD_HASH_METHOD", "scrypt")
+
+    assert login_throttle.verify_password(account, "secret")
+    assert account.password_hash.startswith("scrypt:")
+    assert not account.password_needs_rehash()
+
+
+def test_zero_ttl_identity_cache_reads_the_row_every_time(app, user):
+    from services.identity_cache import IdentityCache
+
+    cache = IdentityCache(ttl=0)
+    cache.put(user)
+    assert cache.get(user.id) is None
+    assert cache.stats()["entries"] == 0
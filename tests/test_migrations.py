@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import sqlalchemy as sa
+from flask_migrate import migrate, upgrade
+
+from extensions import db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+def _baseline_schema(engine):
+    """The tables as they were before the first revision (created by db.create_all() back then)."""
+    metadata = sa.MetaData()
+    sa.Table(
+        "users", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("email", sa.String(120), unique=True, nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("role", sa.String(50)),
+        sa.Column("created_at", sa.DateTime),
+    )
+    sa.Table(
+        "clients", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(120), nullable=False),
+        sa.Column("phone", sa.String(50)),
+        sa.Column("email", sa.String(120)),
+        sa.Column("created_at", sa.DateTime),
+    )
+    for table, column in (("case_updates", sa.Column("summary", sa.Text)),
+                          ("messages", sa.Column("message", sa.Text, nullable=False))):
+        sa.Table(
+            table, metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("client_id", sa.Integer, sa.ForeignKey("clients.id")),
+            column,
+            sa.Column("created_at", sa.DateTime),
+        )
+    metadata.create_all(engine)
+
+
+def _reset(engine):
+    db.drop_all()
+    with engine.begin() as conn:
+        for name in sa.inspect(conn).get_table_names():
+            conn.execute(sa.text(f'DROP TABLE IF EXISTS "{name}"'))
+
+
+def test_revisions_bring_a_baseline_database_up_to_the_models(app, tmp_path):
+    from services.search import init_search_index
+
+    engine = db.engine
+    _reset(engine)
+    _baseline_schema(engine)
+    init_search_index(app)  # FTS5 tables on SQLite, which autogenerate must leave alone
+
+    directory = str(tmp_path / "migrations")
+    shutil.copytree(MIGRATIONS, directory)
+    upgrade(directory=directory)
+
+    # Autogenerate drops empty revisions, so no new file means models and schema agree
+    before = set(os.listdir(os.path.join(directory, "versions")))
+    migrate(directory=directory, message="drift check")
+    assert set(os.listdir(os.path.join(directory, "versions"))) == before
+
+    _reset(engine)
+    db.create_all()
+
+
+def test_revisions_are_no_ops_on_a_create_all_database(app, tmp_path):
+    directory = str(tmp_path / "migrations")
+    shutil.copytree(MIGRATIONS, directory)
+    upgrade(directory=directory)
+    with db.engine.connect() as conn:
+        assert conn.execute(sa.text("SELECT COUNT(*) FROM alembic_version")).scalar() == 1
+        conn.execute(sa.text("DROP TABLE alembic_version"))
+        conn.commit()
@@ -0,0 +1,85 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+from services import notifications
+from services.rate_limit import ProviderRateLimiter
+
+
+class GraphBatchStub(BaseHTTPRequestHandler):
+    """
+    Graph $batch endpoint: throttles throttled@..., rejects reject@..., accepts
+    the rest. once@... is throttled the first time only, with Retry-After: 1.
+    """
+
+    batches = []
+    seen = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self.batches.append(body["requests"])
+        responses = []
+        for request in body["requests"]:
+            recipient = request["body"]["message"]["toRecipients"][0]["emailAddress"]["address"]
+            if recipient.startswith("once@") and recipient not in self.seen:
+                self.seen.add(recipient)
+                responses.append({"id": request["id"], "status": 429, "headers": {"Retry-After": "1"}})
+            elif recipient.startswith("throttled@"):
+                responses.append({"id": request["id"], "status": 429, "headers": {"Retry-After": "7"},
+                                  "body": {"error": {"code": "TooManyRequests", "message": "Slow down"}}})
+            elif recipient.startswith("reject@"):
+                responses.append({"id": request["id"], "status": 400,
+                                  "body": {"error": {"code": "ErrorInvalidRecipients", "message": "Bad address"}}})
+            else:
+                responses.append({"id": request["id"], "status": 202})
+        data = json.dumps({"responses": list(reversed(responses))}).encode()  # Graph does not keep order
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Provider:
+    def get_token(self):
+        return "token"
+
+    def invalidate(self):
+        pass
+
+
+def test_batch_send_chunks_by_twenty_and_maps_each_status(http_stub, monkeypatch):
+    stub = type("Stub", (GraphBatchStub,), {"batches": [], "seen": set()})
+    monkeypatch.setattr(notifications, "GRAPH_API_BASE", http_stub(stub))
+    emails = [(i, f"client{i}@example.com", "Update", "Body") for i in range(25)]
+    emails[3] = (3, "throttled@example.com", "Update", "Body")
+    emails[22] = (22, "reject@example.com", "Update", "Body")
+
+    results = notifications.send_outlook_emails_batch(emails, token_provider=_Provider())
+
+    assert [len(batch) for batch in stub.batches] == [20, 5]
+    assert sorted(results) == list(range(25))
+    assert results[3] == {"ok": False, "status": 429, "error": "Slow down", "retry_after": "7"}
+    assert results[22] == {"ok": False, "status": 400, "error": "Bad address"}
+    assert all(results[i] == {"ok": True, "status": 202, "error": None} for i in range(25) if i not in (3, 22))
+
+
+def test_throttled_emails_are_resent_after_retry_after(http_stub, monkeypatch, tmp_path):
+    stub = type("Stub", (GraphBatchStub,), {"batches": [], "seen": set()})
+    monkeypatch.setattr(notifications, "GRAPH_API_BASE", http_stub(stub))
+    limiter = ProviderRateLimiter(str(tmp_path / "rate_limits.sqlite3"), limits={"graph_mail": (6000, 20)})
+    monkeypatch.setattr(notifications, "get_rate_limiter", lambda: limiter)
+    emails = [(1, "a@example.com", "Update", "Body"), (2, "once@example.com", "Update", "Body")]
+
+    started = time.monotonic()
+    results = notifications.send_outlook_emails_batch(emails, token_provider=_Provider())
+
+    assert time.monotonic() - started >= 1  # the re-send waited out Retry-After
+    assert all(r["ok"] for r in results.values())
+    # Only the throttled email went out again
+    assert [len(batch) for batch in stub.batches] == [2, 1]
+    stats = limiter.stats()["graph_mail"]
+    assert stats["throttled"] == 1 and stats["rate_per_minute"] < 6000
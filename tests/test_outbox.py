@@ -0,0 +1,76 @@
+import threading
+import time
+
+from extensions import db
+from models import NotificationOutbox
+from services import outbox
+
+
+def _slow_sms(calls, delay):
+    def send(message):
+        calls.append(message["id"])
+        time.sleep(delay)
+        return {message["id"]: None}
+    return send
+
+
+def _run_in_context(app, func, results):
+    with app.app_context():
+        results.append(func())
+
+
+def test_round_longer_than_claim_timeout_is_not_resent(app, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_CLAIM_TIMEOUT", 1)
+    monkeypatch.setattr(outbox, "OUTBOX_CLAIM_RENEW_INTERVAL", 0.2)
+    calls = []
+    monkeypatch.setattr(outbox, "_send_sms", _slow_sms(calls, delay=2.5))
+
+    for i in range(3):
+        outbox.enqueue_notification("sms", f"+1555000{i}", "hello")
+    db.session.commit()
+
+    results = []
+    first = threading.Thread(target=_run_in_context, args=(app, outbox.dispatch_outbox, results))
+    first.start()
+    time.sleep(1.5)  # past the original claim expiry, while the sends are still running
+    assert outbox.dispatch_outbox() == {"sent": 0, "failed": 0, "retrying": 0}
+    first.join()
+
+    assert results == [{"sent": 3, "failed": 0, "retrying": 0}]
+    assert sorted(calls) == sorted(set(calls)) and len(calls) == 3
+    db.session.expire_all()
+    assert {row.status for row in NotificationOutbox.query} == {"sent"}
+
+
+def test_stale_dispatcher_does_not_overwrite_new_owner(app, monkeypatch, caplog):
+    row = outbox.enqueue_notification("sms", "+15550000", "hello")
+    db.session.commit()
+    rows = outbox.claim_batch()
+
+    def stolen(message):
+        # Another dispatcher takes the row over while this send is in flight
+        db.session.execute(
+            db.update(NotificationOutbox).where(NotificationOutbox.id == message["id"])
+            .values(claimed_by="other-dispatcher")
+        )
+        db.session.commit()
+        return {message["id"]: "HTTP 500"}
+
+    monkeypatch.setattr(outbox, "_send_sms", stolen)
+    monkeypatch.setattr(outbox, "NOTIFY_ENGINE", "threads")
+    # Run the send on this thread so it shares the test's session
+    monkeypatch.setattr(outbox, "_pools", {"sms": _Inline(), "email": _Inline(), "async": _Inline()})
+
+    assert outbox.dispatch_batch(rows) == (0, 0, 0)
+    db.session.expire_all()
+    row = db.session.get(NotificationOutbox, row.id)
+    assert (row.status, row.claimed_by, row.attempts, row.last_error) == ("sending", "other-dispatcher", 0, None)
+    assert "lost 1 row(s)" in caplog.text
+
+
+class _Inline:
+    def submit(self, func, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(func(*args))
+        return future
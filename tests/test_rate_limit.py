@@ -0,0 +1,78 @@
+import pytest
+
+from services import rate_limit
+from services.rate_limit import ProviderRateLimiter, RateLimited
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def limiter(tmp_path, clock):
+    # 60/min is one token a second, with room for a burst of two
+    return ProviderRateLimiter(str(tmp_path / "rate_limits.sqlite3"), limits={"sms": (60, 2)})
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(limiter, clock):
+    assert limiter.try_acquire("sms") == 0
+    assert limiter.try_acquire("sms") == 0
+    assert limiter.try_acquire("sms") == pytest.approx(1.0)
+    clock.now += 1
+    assert limiter.try_acquire("sms") == 0
+
+
+def test_429_blocks_until_retry_after_and_halves_the_rate(limiter, clock):
+    limiter.throttled("sms", "10")
+
+    assert limiter.try_acquire("sms") == pytest.approx(10)
+    stats = limiter.stats()["sms"]
+    assert (stats["rate_per_minute"], stats["throttled"]) == (30, 1)
+
+    # Tokens only start refilling once the block is over, at the halved rate
+    clock.now += 10
+    assert limiter.try_acquire("sms") == pytest.approx(2.0)
+    clock.now += 2
+    assert limiter.try_acquire("sms") == 0
+
+
+def test_successes_bring_the_rate_back_to_the_ceiling(limiter):
+    limiter.throttled("sms", "0")
+    rates = []
+    for _ in range(30):
+        limiter.succeeded("sms")
+        rates.append(limiter.stats()["sms"]["rate_per_minute"])
+
+    assert rates == sorted(rates) and rates[0] == pytest.approx(31.2)
+    assert rates[-1] == 60  # capped at the ceiling
+
+
+def test_repeated_429s_stop_at_the_floor(limiter):
+    for _ in range(10):
+        limiter.throttled("sms", "0")
+    assert limiter.stats()["sms"]["rate_per_minute"] == pytest.approx(60 * rate_limit.RATE_FLOOR_SHARE)
+
+
+def test_acquire_gives_up_past_max_wait(limiter, clock):
+    limiter.throttled("sms", "120")
+    with pytest.raises(RateLimited):
+        limiter.acquire("sms", max_wait=60)
+    limiter.acquire("sms", max_wait=300)  # sleeps out the block on the fake clock
+    assert clock.now >= 1_000_000 + 120
@@ -0,0 +1,109 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from services import ringcentral_session
+from services.rate_limit import ProviderRateLimiter
+from services.ringcentral_session import SMS_ENDPOINT, RingCentralSession
+
+
+class RingCentralStub(BaseHTTPRequestHandler):
+    """OAuth token endpoint plus the SMS endpoint, which answers from a scripted list of statuses."""
+
+    expires_in = 3600
+    sms_statuses = []
+    grants = []
+    sms_tokens = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if self.path.startswith("/restapi/oauth/token"):
+            grant = "refresh_token" if "grant_type=refresh_token" in body else "login"
+            self.grants.append(grant)
+            return self._send({
+                "access_token": f"token-{len(self.grants)}", "token_type": "Bearer",
+                "expires_in": self.expires_in, "refresh_token": f"refresh-{len(self.grants)}",
+                "refresh_token_expires_in": 604800, "scope": "SMS", "owner_id": "1",
+            })
+        if self.path == SMS_ENDPOINT:
+            self.sms_tokens.append(self.headers.get("Authorization"))
+            status = self.sms_statuses.pop(0) if self.sms_statuses else 200
+            if status == 429:
+                return self._send({"errorCode": "CMN-301"}, 429, {"Retry-After": "1"})
+            if status == 401:
+                return self._send({"errorCode": "TokenInvalid"}, 401)
+            return self._send({"id": len(self.sms_tokens), "messageStatus": "Queued"})
+        self._send({}, 404)
+
+
+@pytest.fixture
+def stub(http_stub):
+    handler = type("Stub", (RingCentralStub,), {"sms_statuses": [], "grants": [], "sms_tokens": []})
+    handler.base_url = http_stub(handler)
+    return handler
+
+
+def _session(stub):
+    return RingCentralSession("client-id", "client-secret", stub.base_url, jwt="jwt-assertion")
+
+
+def test_429_is_resent_after_retry_after(stub, monkeypatch, tmp_path):
+    limiter = ProviderRateLimiter(str(tmp_path / "rate_limits.sqlite3"), limits={"ringcentral_sms": (6000, 10)})
+    monkeypatch.setattr(ringcentral_session, "get_rate_limiter", lambda: limiter)
+    stub.sms_statuses = [429]
+
+    started = time.monotonic()
+    response = _session(stub).send_sms("+15550001", "+15550002", "Hearing moved")
+
+    assert time.monotonic() - started >= 1
+    assert response.json_dict()["messageStatus"] == "Queued"
+    assert len(stub.sms_tokens) == 2
+    assert limiter.stats()["ringcentral_sms"]["throttled"] == 1
+
+
+def test_token_is_reused_within_the_refresh_margin(stub):
+    session = _session(stub)
+    session.send_sms("+15550001", "+15550002", "one")
+    session.send_sms("+15550001", "+15550003", "two")
+
+    assert stub.grants == ["login"]
+    assert stub.sms_tokens == ["Bearer token-1", "Bearer token-1"]
+    assert (session.logins, session.refreshes) == (1, 0)
+
+
+def test_token_is_refreshed_once_inside_the_margin(stub, monkeypatch):
+    # An hour-long token is already "due" when the margin is longer than that
+    monkeypatch.setattr(ringcentral_session, "RINGCENTRAL_REFRESH_MARGIN", stub.expires_in + 60)
+    session = _session(stub)
+    session.send_sms("+15550001", "+15550002", "one")
+    session.send_sms("+15550001", "+15550003", "two")
+
+    assert stub.grants == ["login", "refresh_token"]
+    assert stub.sms_tokens == ["Bearer token-1", "Bearer token-2"]
+    assert (session.logins, session.refreshes) == (1, 1)
+
+
+def test_revoked_token_triggers_one_fresh_login(stub):
+    stub.sms_statuses = [401]
+    session = _session(stub)
+
+    response = session.send_sms("+15550001", "+15550002", "one")
+
+    assert response.json_dict()["messageStatus"] == "Queued"
+    assert stub.grants == ["login", "login"]
+    assert stub.sms_tokens == ["Bearer token-1", "Bearer token-2"]
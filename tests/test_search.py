@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import CaseUpdate, Client, Message
+from services import search
+
+
+@pytest.fixture
+def activity(app):
+    client = Client(name="Ada Lovelace")
+    db.session.add(client)
+    db.session.flush()
+    db.session.add_all([
+        Message(client_id=client.id, message="Deposition moved to Friday", created_at=datetime(2026, 3, 1, 9, 30)),
+        CaseUpdate(client_id=client.id, summary="Settlement offer at 100% of damages", created_at=datetime(2026, 3, 2, 14, 5)),
+    ])
+    db.session.commit()
+    return client
+
+
+@pytest.fixture
+def fts(app, monkeypatch):
+    if db.engine.dialect.name != "sqlite":
+        pytest.skip("FTS5 is SQLite-only")
+    monkeypatch.setattr(search, "fts_enabled", None)
+    assert search.init_search_index(app)
+
+
+@pytest.fixture
+def like_only(app, monkeypatch):
+    monkeypatch.setattr(search, "fts_enabled", False)
+
+
+def _hits(query):
+    return [(hit["type"], hit["created_at"]) for hit in search.search(query)]
+
+
+@pytest.mark.parametrize("backend", ["fts", "like_only"])
+def test_both_backends_return_iso_timestamps(backend, activity, request):
+    request.getfixturevalue(backend)
+    assert _hits("deposition") == [("message", "2026-03-01T09:30:00")]
+    assert _hits("settlement") == [("case_update", "2026-03-02T14:05:00")]
+
+
+@pytest.mark.parametrize("query", ["", "   ", '"', "* OR ^", "NEAR(", "-"])
+def test_empty_or_operator_only_queries_return_nothing(fts, activity, query):
+    assert search.search(query) == []
+
+
+def test_fts_treats_operator_words_as_plain_text(fts, activity):
+    assert search.search("deposition AND") == []  # both words must appear, "AND" is not an operator
+    assert _hits("depo") == [("message", "2026-03-01T09:30:00")]  # prefix match on the last word
+
+
+def test_like_fallback_matches_substrings_newest_first(like_only, activity):
+    db.session.add(Message(client_id=activity.id, message="Second deposition notice", created_at=datetime(2026, 3, 5)))
+    db.session.commit()
+
+    hits = search.search("DEPOSITION")
+    assert [hit["snippet"] for hit in hits] == ["Second deposition notice", "Deposition moved to Friday"]
+    assert all(hit["client_name"] == "Ada Lovelace" for hit in hits)
+    assert search.search("  ") == []
+
+
+def test_like_fallback_escapes_wildcards(like_only, activity):
+    assert [hit["type"] for hit in search.search("100%")] == ["case_update"]
+    assert [hit["type"] for hit in search.search("%")] == ["case_update"]  # not the message too
+    assert search.search("_") == []
+
+
+def test_index_follows_updates_and_deletes(fts, activity):
+    update = CaseUpdate.query.one()
+    update.summary = "Mediation scheduled for April"
+    db.session.commit()
+    assert search.search("settlement") == []
+    assert [hit["id"] for hit in search.search("mediation")] == [update.id]
+
+    db.session.delete(update)
+    message = Message.query.one()
+    db.session.delete(message)
+    db.session.commit()
+    assert search.search("mediation") == []
+    assert search.search("deposition") == []
@@ -0,0 +1,23 @@
+import time
+
+from services.token_bucket import MemoryTokenBuckets
+
+
+def test_memory_buckets_limit_and_refill():
+    buckets = MemoryTokenBuckets()
+    assert [buckets.consume("k", rate=10, burst=2) for _ in range(2)] == [0.0, 0.0]
+    assert buckets.consume("k", rate=10, burst=2) > 0
+    time.sleep(0.15)
+    assert buckets.consume("k", rate=10, burst=2) == 0.0
+
+
+def test_memory_buckets_stay_under_the_cap_and_keep_recent_keys():
+    buckets = MemoryTokenBuckets(max_keys=100)
+    buckets.consume("busy", rate=0.001, burst=1)
+    for i in range(10000):
+        buckets.consume(f"flood-{i}", rate=0.001, burst=1)
+        if i % 50 == 0:
+            buckets.consume("busy", rate=0.001, burst=1)  # still throttled, stays recent
+    assert len(buckets) <= 100
+    assert buckets.consume("busy", rate=0.001, burst=1) > 0
+
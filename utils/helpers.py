@@ -1,5 +1,24 @@
+import base64
+import json
+
 # small helpers if needed
 def short(s, n=80):
     if not s:
         return ""
     return s if len(s) <= n else s[:n-1] + "…"
+
+# opaque keyset-pagination cursors
+def encode_cursor(*values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values